@@ -0,0 +1,132 @@
+'''
+Cache for corpus metadata that is needed to handle search requests.
+
+Endpoints like the search and visualisation views need the index, alias and fields of a
+corpus several times per request. `corpus_metadata` loads this information once and
+keeps it until the end of the request (or celery task), so the rest of the request does
+not need to repeat the same database queries.
+
+The cache is local to the current thread, and is cleared when a request or task starts.
+When a corpus, its configuration, or one of its fields is saved or deleted (see
+`addcorpus.signals`), a shared version in the default Django cache is changed; each
+thread compares this version to that of its own cache, so other threads do not keep
+using outdated metadata.
+'''
+
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
+from uuid import uuid4
+
+from django.core.cache import cache
+
+from addcorpus.models import Corpus
+from es.client import server_for_corpus
+
+_local = threading.local()
+
+VERSION_CACHE_KEY = 'corpus_metadata_version'
+
+
+class FieldMetadata(NamedTuple):
+    name: str
+    es_mapping: Dict
+    language: str
+
+
+class CorpusMetadata(NamedTuple):
+    id: int
+    name: str
+    server_name: str
+    es_index: Optional[str]
+    es_alias: Optional[str]
+    min_year: Optional[int]
+    max_year: Optional[int]
+    fields: Tuple[FieldMetadata, ...]
+
+    @property
+    def has_configuration(self) -> bool:
+        return self.es_index is not None
+
+    def get_field(self, field_name: str) -> FieldMetadata:
+        '''
+        Get the metadata of a field. Raises a `KeyError` if the corpus has no field with
+        this name.
+        '''
+        for field in self.fields:
+            if field.name == field_name:
+                return field
+        raise KeyError(f'Corpus {self.name} has no field {field_name}')
+
+
+def _store() -> Dict[str, CorpusMetadata]:
+    if not hasattr(_local, 'corpora'):
+        _local.corpora = {}
+    return _local.corpora
+
+
+def _current_store() -> Dict[str, CorpusMetadata]:
+    '''
+    The cache of the current thread, cleared if the metadata has changed since it was
+    filled.
+    '''
+    store = _store()
+    version = cache.get(VERSION_CACHE_KEY)
+    if getattr(_local, 'version', None) != version:
+        store.clear()
+        _local.version = version
+    return store
+
+
+def _load(corpus_name: str) -> CorpusMetadata:
+    corpus = Corpus.objects.select_related('configuration').get(name=corpus_name)
+    conf = corpus.configuration_obj
+
+    if conf:
+        fields = tuple(
+            FieldMetadata(field.name, field.es_mapping, field.language)
+            for field in conf.fields.all()
+        )
+    else:
+        fields = tuple()
+
+    return CorpusMetadata(
+        id=corpus.pk,
+        name=corpus.name,
+        server_name=server_for_corpus(corpus.name),
+        es_index=conf.es_index if conf else None,
+        es_alias=conf.es_alias if conf else None,
+        min_year=conf.min_year if conf else None,
+        max_year=conf.max_year if conf else None,
+        fields=fields,
+    )
+
+
+def corpus_metadata(corpus_name: str) -> CorpusMetadata:
+    '''
+    Get the metadata of a corpus.
+
+    Raises `Corpus.DoesNotExist` if there is no corpus with this name.
+    '''
+    store = _current_store()
+    if corpus_name not in store:
+        store[corpus_name] = _load(corpus_name)
+    return store[corpus_name]
+
+
+def clear_corpus_metadata(*args, **kwargs) -> None:
+    '''
+    Clear the metadata cache of the current thread.
+
+    Accepts any arguments, so it can be connected to signals directly.
+    '''
+    _store().clear()
+
+
+def invalidate_corpus_metadata(*args, **kwargs) -> None:
+    '''
+    Clear the metadata cache of all threads, by changing the shared version.
+
+    Accepts any arguments, so it can be connected to signals directly.
+    '''
+    cache.set(VERSION_CACHE_KEY, uuid4().hex, timeout=None)
+    clear_corpus_metadata()
@@ -5,6 +5,7 @@ from django.contrib.auth.models import AbstractUser
 from django.db.models import Q, QuerySet
 
 from users.models import PUBLIC_GROUP_NAME
+from addcorpus.metadata import corpus_metadata
 from addcorpus.models import Corpus, CorpusConfiguration
 
 
@@ -108,12 +109,12 @@ class CanSearchCorpus(permissions.BasePermission):
 
         # check if the corpus exists
         try:
-            corpus = Corpus.objects.get(name=corpus_name)
+            metadata = corpus_metadata(corpus_name)
         except:
             raise NotFound('Corpus does not exist')
 
         # check if the user has access
-        return can_search(user, corpus)
+        return searchable_corpora(user).filter(pk=metadata.id).exists()
 
 
 class CanEditCorpus(permissions.BasePermission):
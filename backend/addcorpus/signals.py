@@ -1,9 +1,12 @@
+from celery.signals import task_prerun
+from django.core.signals import request_started
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from addcorpus.json_corpora.csv_field_info import get_csv_info
+from addcorpus.metadata import clear_corpus_metadata, invalidate_corpus_metadata
 
-from .models import CorpusDataFile
+from .models import Corpus, CorpusConfiguration, CorpusDataFile, Field
 
 
 @receiver(post_delete, sender=CorpusDataFile)
@@ -20,3 +23,12 @@ def save_csv_info(sender, instance: CorpusDataFile, **kwargs):
     csv_info = get_csv_info(instance.file.path)
     CorpusDataFile.objects.filter(id=instance.id).update(
         csv_info=csv_info)
+
+
+# corpus metadata is cached for the duration of a request or task
+request_started.connect(clear_corpus_metadata, dispatch_uid='clear_corpus_metadata')
+task_prerun.connect(clear_corpus_metadata, dispatch_uid='clear_corpus_metadata')
+
+for model in [Corpus, CorpusConfiguration, Field]:
+    post_save.connect(invalidate_corpus_metadata, sender=model)
+    post_delete.connect(invalidate_corpus_metadata, sender=model)
@@ -0,0 +1,48 @@
+from threading import Thread
+
+from addcorpus.metadata import (
+    corpus_metadata, clear_corpus_metadata, invalidate_corpus_metadata
+)
+from addcorpus.models import Corpus, Field
+
+
+def test_corpus_metadata(db, basic_mock_corpus, django_assert_num_queries):
+    corpus = Corpus.objects.get(name=basic_mock_corpus)
+
+    metadata = corpus_metadata(basic_mock_corpus)
+    assert metadata.id == corpus.pk
+    assert metadata.es_index == corpus.configuration.es_index
+    assert [field.name for field in metadata.fields] == [
+        field.name for field in corpus.configuration.fields.all()
+    ]
+
+    with django_assert_num_queries(0):
+        assert corpus_metadata(basic_mock_corpus) == metadata
+
+    clear_corpus_metadata()
+    with django_assert_num_queries(2):
+        corpus_metadata(basic_mock_corpus)
+
+
+def test_corpus_metadata_invalidation(db, basic_mock_corpus):
+    metadata = corpus_metadata(basic_mock_corpus)
+    field = Field.objects.get(
+        corpus_configuration__corpus__name=basic_mock_corpus,
+        name=metadata.fields[0].name,
+    )
+    field.language = 'fr'
+    field.save()
+
+    assert corpus_metadata(basic_mock_corpus).get_field(field.name).language == 'fr'
+
+
+def test_corpus_metadata_invalidation_other_thread(db, basic_mock_corpus, django_assert_num_queries):
+    corpus_metadata(basic_mock_corpus)
+
+    # a change in another thread invalidates the cache of this thread
+    thread = Thread(target=invalidate_corpus_metadata)
+    thread.start()
+    thread.join()
+
+    with django_assert_num_queries(2):
+        corpus_metadata(basic_mock_corpus)
@@ -16,10 +16,11 @@ from indexing.create_job import create_indexing_job
 from indexing.run_job import perform_indexing
 from django.conf import settings
 from django.contrib.auth.models import Group
+from addcorpus.metadata import clear_corpus_metadata
 from addcorpus.models import Corpus, CorpusDataFile
 from addcorpus.serializers import CorpusJSONDefinitionSerializer, CorpusDataFileSerializer
 from es.models import Server
-from django.core.cache import cache
+from django.core.cache import caches
 
 
 @pytest.fixture(autouse=True)
@@ -280,7 +281,11 @@ def celery_config():
 
 @pytest.fixture(autouse=True)
 def auto_clear_cache():
-    '''Automatically clear the cache before and after each test.'''
-    cache.clear()
+    '''Automatically clear the caches before and after each test.'''
+    for cache in caches.all():
+        cache.clear()
+    clear_corpus_metadata()
     yield
-    cache.clear()
+    for cache in caches.all():
+        cache.clear()
+    clear_corpus_metadata()
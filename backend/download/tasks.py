@@ -35,7 +35,10 @@ def complete_failed_download(request, exc, traceback, log_id):
 def download_scroll(request_json, download_size=10000):
     corpus_name = request_json['corpus']
     es_query = api_query_to_es_query(request_json, corpus_name)
-    results, _ = es_download.scroll(corpus_name, es_query, download_size)
+    kwargs = {}
+    if 'fields' in request_json:
+        kwargs['source_includes'] = es_download.source_includes(request_json['fields'])
+    results, _ = es_download.scroll(corpus_name, es_query, download_size, **kwargs)
     return results
 
 
@@ -45,7 +48,9 @@ def make_download(request_json, download_id, download_size=None, user=None):
     corpus = Corpus.objects.get(name=corpus_name)
     es_query = api_query_to_es_query(request_json, corpus_name)
     results, _total = es_download.scroll(
-        corpus_name, es_query, download_size)
+        corpus_name, es_query, download_size,
+        source_includes=es_download.source_includes(request_json['fields']),
+    )
 
     filepath = create_csv.search_results_csv(
         results,
@@ -1,26 +1,72 @@
+from copy import deepcopy
+import os
+from threading import Lock
 from elasticsearch import Elasticsearch
 
 from django.conf import settings
 
+DEFAULT_CONNECTIONS_PER_NODE = 10
+
+_clients = {}
+'Shared clients by server name, stored as (server config, client) tuples'
+_clients_lock = Lock()
+
 def elasticsearch(corpus_name):
     '''
-    Create ElasticSearch instance for a corpus.
+    Get the ElasticSearch client for a corpus.
 
     If multiple Elasticsearch servers are configured in the project, the server is
     selected based on the CORPUS_SERVER_NAMES setting.
     '''
     server_name = server_for_corpus(corpus_name)
-    server_config = settings.SERVERS[server_name]
-
-    return client_from_config(server_config)
+    return client_for_server(server_name)
 
 def server_for_corpus(corpus_name) -> str:
     return settings.CORPUS_SERVER_NAMES.get(corpus_name, 'default')
 
 
+def client_for_server(server_name) -> Elasticsearch:
+    '''
+    Get the Elasticsearch client for a server in the SERVERS setting.
+
+    Clients are shared within a process, so connections in their pool are kept alive
+    and reused between requests. If the configuration of the server changes, its
+    client is closed and replaced. Child processes (e.g. celery workers) do not share
+    clients with their parent.
+    '''
+    server_config = settings.SERVERS[server_name]
+
+    with _clients_lock:
+        config, client = _clients.get(server_name, (None, None))
+        if config != server_config:
+            if client is not None:
+                client.close()
+            # store a copy, in case the settings are modified in place
+            config = deepcopy(server_config)
+            client = client_from_config(config)
+            _clients[server_name] = (config, client)
+        return client
+
+
+def clear_clients():
+    '''
+    Forget all shared clients. Used after forking, since connections cannot be
+    shared between processes.
+    '''
+    global _clients_lock
+    _clients.clear()
+    # the lock may have been held by another thread at the time of the fork
+    _clients_lock = Lock()
+
+os.register_at_fork(after_in_child=clear_clients)
+
+
 def client_from_config(server_config):
     '''
     Create an Elasticsearch instance from server configuration
+
+    This creates a new client with its own connection pool; use `client_for_server`
+    to get a shared client.
     '''
     node = {'host': server_config['host'],
             'port': int(server_config['port']),
@@ -29,7 +75,10 @@ def client_from_config(server_config):
     kwargs = {
         'max_retries': 15,
         'retry_on_timeout': True,
-        'request_timeout': 60
+        'request_timeout': server_config.get('request_timeout', 60),
+        'connections_per_node': server_config.get(
+            'connections_per_node', DEFAULT_CONNECTIONS_PER_NODE
+        ),
     }
     if server_config.get('certs_location') and server_config.get('api_key'):
         # settings to connect via SSL are present
@@ -1,10 +1,16 @@
-from typing import Dict, Tuple
+import json
+import logging
+import queue
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
 from django.conf import settings
 
 from es.client import elasticsearch
 from es.search import get_index, search, hits, total_hits
 import itertools
 
+logger = logging.getLogger(__name__)
+
 
 def scroll(corpus, query_model, download_size=None, client=None, **kwargs) -> Tuple[itertools.chain[Dict], int]:
     chunks, total = scroll_chunks(corpus, query_model,
@@ -18,16 +24,52 @@ def scroll_chunks(corpus, query_model, download_size=None, client=None, **kwargs
     if not client:
         client = elasticsearch(index)
     server = settings.CORPUS_SERVER_NAMES.get(corpus, 'default')
-    scroll_timeout = settings.SERVERS[server]['scroll_timeout']
-    scroll_page_size = settings.SERVERS[server]['scroll_page_size']
+    server_config = settings.SERVERS[server]
+    scroll_timeout = server_config['scroll_timeout']
+    scroll_page_size = server_config['scroll_page_size']
     size = min(download_size,
                scroll_page_size) if download_size else scroll_page_size
-    total = get_total_hits(client, index, query_model, **kwargs)
-    chunks = make_chunks(client, index, size,
-                         scroll_timeout, query_model, total, download_size, **kwargs)
+    if server_config.get('scroll_backend') == 'pit':
+        slices = server_config.get('scroll_slices', 1)
+        chunks, total = make_pit_chunks(client, index, size, scroll_timeout,
+                                        query_model, download_size, slices, **kwargs)
+    else:
+        total = get_total_hits(client, index, query_model, **kwargs)
+        chunks = make_chunks(client, index, size,
+                             scroll_timeout, query_model, total, download_size, **kwargs)
+    if logger.isEnabledFor(logging.DEBUG):
+        chunks = log_transferred_size(chunks, index, kwargs.get('source_includes'))
     return chunks, total
 
 
+def source_includes(fields: Iterable[Optional[str]]) -> List[str]:
+    '''
+    The minimal list of `_source` fields to request in order to use the given fields.
+    Can be passed as the `source_includes` argument of `scroll` or `scroll_chunks`.
+    '''
+    return sorted(set(filter(None, fields)))
+
+
+def log_transferred_size(chunks, index, includes=None):
+    '''
+    Pass on chunks of hits, and log their total size once they have been consumed.
+
+    The size is measured by serialising the hits, so this should only be used for
+    debugging.
+    '''
+    n_hits = 0
+    n_bytes = 0
+    for chunk in chunks:
+        n_hits += len(chunk)
+        n_bytes += len(json.dumps(chunk))
+        yield chunk
+
+    source = ', '.join(includes) if includes else 'all fields'
+    logger.debug(
+        f'Scrolled {n_hits} hits from {index} ({n_bytes} bytes; source: {source})'
+    )
+
+
 def get_total_hits(client, index, query_model, **kwargs) -> int:
     search_results = client.search(
         index=index,
@@ -63,6 +105,142 @@ def make_chunks(client, index, size, scroll_timeout, query_model, total, downloa
     client.clear_scroll(scroll_id=scroll_id)
 
 
+def make_pit_chunks(client, index, size, keep_alive, query_model, download_size=None, slices=1, **kwargs):
+    '''
+    Alternative to `make_chunks` that pages through results with a point in time (PIT)
+    and `search_after`, instead of the scroll API.
+
+    Results are sorted like the query, or by relevance if the query has no sort.
+
+    If `slices` is more than 1, the PIT is split into slices which are read
+    concurrently in separate threads. Chunks are yielded in the order in which they
+    are received, so results are not sorted across slices. Because of that, slices
+    are only used if the query has no explicit sort and there is no `download_size`;
+    otherwise, results are read in a single slice.
+
+    The first page of each slice is requested immediately to get the total number of
+    hits, so no separate count query is needed.
+
+    Returns a tuple with a generator of chunks, and the total number of hits.
+    '''
+    query_model = dict(query_model)
+    sort = query_model.pop('sort', None)
+    if slices > 1 and (sort or download_size):
+        logger.debug('Reading PIT in a single slice, so results are sorted')
+        slices = 1
+    sort = sort or ['_score']
+    # _shard_doc is a tiebreaker, so search_after does not skip hits
+    sort = (sort if isinstance(sort, list) else [sort]) + [{'_shard_doc': 'asc'}]
+
+    pit_id = client.open_point_in_time(index=index, keep_alive=keep_alive)['id']
+
+    def search_page(slice=None, search_after=None, track_total_hits=False):
+        return client.search(
+            pit={'id': pit_id, 'keep_alive': keep_alive},
+            size=size,
+            sort=sort,
+            slice=slice,
+            search_after=search_after,
+            track_total_hits=track_total_hits,
+            **query_model,
+            **kwargs
+        )
+
+    def pages(slice, first_result):
+        page = hits(first_result)
+        while page:
+            yield page
+            page = hits(search_page(slice, page[-1]['sort']))
+
+    try:
+        slice_specs = [
+            {'id': i, 'max': slices} if slices > 1 else None
+            for i in range(slices)
+        ]
+        first_results = [
+            search_page(slice, track_total_hits=True) for slice in slice_specs
+        ]
+    except Exception:
+        client.close_point_in_time(id=pit_id)
+        raise
+
+    total = sum(total_hits(result) for result in first_results)
+    slice_pages = [
+        pages(slice, result) for slice, result in zip(slice_specs, first_results)
+    ]
+
+    def chunks():
+        try:
+            num_results = 0
+            for chunk in _merge_pages(slice_pages):
+                if download_size:
+                    chunk = chunk[:download_size - num_results]
+                num_results += len(chunk)
+                yield chunk
+                if download_size and num_results >= download_size:
+                    return
+        finally:
+            client.close_point_in_time(id=pit_id)
+
+    return chunks(), total
+
+
+_DONE = object()
+
+def _merge_pages(page_generators):
+    '''
+    Iterate over pages from several generators, reading each generator in a
+    separate thread.
+    '''
+    if len(page_generators) == 1:
+        yield from page_generators[0]
+        return
+
+    pages = queue.Queue(maxsize=2 * len(page_generators))
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def read(generator):
+        try:
+            for page in generator:
+                if stop.is_set():
+                    return
+                put(page)
+        except Exception as e:
+            put(e)
+        finally:
+            put(_DONE)
+
+    threads = [
+        threading.Thread(target=read, args=(generator,), daemon=True)
+        for generator in page_generators
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        running = len(threads)
+        while running:
+            item = pages.get()
+            if item is _DONE:
+                running -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
 def normal_search(corpus, query_model):
     result = search(
         corpus=corpus,
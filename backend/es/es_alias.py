@@ -1,7 +1,6 @@
 from typing import Generator
 
 from addcorpus.models import CorpusConfiguration
-from es.client import client_from_config
 from es.models import Server, Index
 
 
@@ -13,7 +12,7 @@ def get_current_index_name(corpus: CorpusConfiguration, client) -> str:
 
 
 def indices_with_alias(server: Server, alias: str) -> Generator[Index, None, None]:
-    client = client_from_config(server.configuration)
+    client = server.client()
     if client.indices.exists_alias(name=alias):
         for index_name in client.indices.get_alias(name=alias):
             aliased_index, _ = Index.objects.get_or_create(
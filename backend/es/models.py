@@ -6,7 +6,7 @@ from elasticsearch import Elasticsearch
 import logging
 
 from addcorpus import models as corpus_models
-from es.client import client_from_config
+from es.client import client_for_server
 
 logger = logging.getLogger()
 
@@ -50,9 +50,8 @@ class Server(models.Model):
         '''
         Elasticsearch client for the server
         '''
-        config = self.configuration
-        if config:
-            return client_from_config(config)
+        if self.configuration:
+            return client_for_server(self.name)
 
 
     def can_connect(self) -> bool:
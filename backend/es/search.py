@@ -1,10 +1,13 @@
 from typing import Dict
 from es.client import elasticsearch
+from addcorpus.metadata import corpus_metadata
 from addcorpus.models import CorpusConfiguration
 
 def get_index(corpus_name):
-    corpus_conf = CorpusConfiguration.objects.get(corpus__name=corpus_name)
-    return corpus_conf.es_index
+    metadata = corpus_metadata(corpus_name)
+    if not metadata.has_configuration:
+        raise CorpusConfiguration.DoesNotExist(f'Corpus {corpus_name} has no configuration')
+    return metadata.es_index
 
 def search(corpus, query_model: Dict = {}, client = None, **kwargs):
     """
@@ -0,0 +1,19 @@
+from copy import deepcopy
+
+from es import client as es_client
+
+
+def test_client_for_server(settings):
+    settings.SERVERS = deepcopy(settings.SERVERS)
+    client = es_client.client_for_server('default')
+    assert es_client.client_for_server('default') is client
+
+    settings.SERVERS['default']['request_timeout'] = 30
+    new_client = es_client.client_for_server('default')
+    assert new_client is not client
+    assert es_client.client_for_server('default') is new_client
+    # the old client is replaced, not kept next to the new one
+    assert es_client._clients['default'][1] is new_client
+
+    es_client.clear_clients()
+    assert es_client.client_for_server('default') is not new_client
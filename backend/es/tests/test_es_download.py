@@ -0,0 +1,126 @@
+import pytest
+from copy import deepcopy
+
+from es import download
+from visualization.query import MATCH_ALL
+
+
+def test_source_includes():
+    assert download.source_includes(['title', 'content', 'title', None]) == ['content', 'title']
+
+
+def test_scroll_source_includes(small_mock_corpus, index_small_mock_corpus):
+    results, total = download.scroll(
+        small_mock_corpus, MATCH_ALL,
+        source_includes=download.source_includes(['title']),
+    )
+    results = list(results)
+
+    assert total > 0
+    assert len(results) == total
+    for hit in results:
+        assert list(hit['_source'].keys()) == ['title']
+
+
+class MockPITClient:
+    '''Mock client that pages through a list of numbered documents with a PIT.'''
+
+    def __init__(self, num_docs):
+        self.docs = list(range(num_docs))
+        # distinct scores, in a different order than the documents
+        self.scores = {doc: (doc * 37) % num_docs for doc in self.docs}
+        self.open_pits = 0
+        self.slices = []
+
+    def open_point_in_time(self, index, keep_alive):
+        self.open_pits += 1
+        return {'id': 'pit'}
+
+    def close_point_in_time(self, id):
+        self.open_pits -= 1
+
+    def _sort_key(self, sort, doc):
+        if sort[0] == '_score':
+            return (-self.scores[doc], doc)
+        return (doc,)
+
+    def search(self, pit, size, sort, slice=None, search_after=None, **kwargs):
+        self.slices.append(slice)
+        docs = self.docs
+        if slice:
+            docs = [doc for doc in docs if doc % slice['max'] == slice['id']]
+        total = len(docs)
+        docs = sorted(docs, key=lambda doc: self._sort_key(sort, doc))
+        if search_after:
+            docs = [
+                doc for doc in docs
+                if self._sort_key(sort, doc) > tuple(search_after)
+            ]
+        return {'hits': {
+            'total': {'value': total},
+            'hits': [
+                {'_id': doc, '_score': self.scores[doc], 'sort': list(self._sort_key(sort, doc))}
+                for doc in docs[:size]
+            ],
+        }}
+
+
+@pytest.mark.parametrize('slices', [1, 3])
+@pytest.mark.parametrize('download_size,expected', [(None, 100), (25, 25), (500, 100)])
+def test_pit_chunks(slices, download_size, expected):
+    client = MockPITClient(100)
+    chunks, total = download.make_pit_chunks(
+        client, 'test-index', 10, '1m', MATCH_ALL, download_size, slices
+    )
+    assert total == 100
+
+    ids = [hit['_id'] for chunk in chunks for hit in chunk]
+    assert len(ids) == expected
+    assert len(set(ids)) == expected
+    assert client.open_pits == 0
+
+
+@pytest.mark.parametrize('slices', [1, 3])
+def test_pit_chunks_relevance_order(slices):
+    client = MockPITClient(100)
+    chunks, _ = download.make_pit_chunks(
+        client, 'test-index', 10, '1m', MATCH_ALL, download_size=25, slices=slices
+    )
+    hits = [hit for chunk in chunks for hit in chunk]
+
+    # the top 25 hits by score, in order
+    expected = sorted(client.docs, key=lambda doc: -client.scores[doc])[:25]
+    assert [hit['_id'] for hit in hits] == expected
+    # a download size prevents slicing
+    assert all(slice is None for slice in client.slices)
+
+
+def test_pit_chunks_explicit_sort():
+    client = MockPITClient(100)
+    query = {**MATCH_ALL, 'sort': [{'id': 'asc'}]}
+    chunks, _ = download.make_pit_chunks(client, 'test-index', 10, '1m', query, slices=3)
+
+    assert [hit['_id'] for chunk in chunks for hit in chunk] == client.docs
+    assert all(slice is None for slice in client.slices)
+
+
+def test_pit_chunks_stop_early():
+    client = MockPITClient(1000)
+    chunks, _ = download.make_pit_chunks(client, 'test-index', 10, '1m', MATCH_ALL, slices=4)
+    next(chunks)
+    chunks.close()
+    assert client.open_pits == 0
+
+
+def test_scroll_pit_backend(settings, small_mock_corpus, index_small_mock_corpus):
+    expected, expected_total = download.scroll(small_mock_corpus, MATCH_ALL)
+    expected_ids = set(hit['_id'] for hit in expected)
+
+    servers = deepcopy(settings.SERVERS)
+    servers['default']['scroll_backend'] = 'pit'
+    servers['default']['scroll_slices'] = 2
+    settings.SERVERS = servers
+    results, total = download.scroll(small_mock_corpus, MATCH_ALL)
+
+    assert total == expected_total
+    assert set(hit['_id'] for hit in results) == expected_ids
@@ -67,6 +67,9 @@ SERVERS = {
         'bulk_timeout': '60s',  # Timeout of ES bulk operation
         'scroll_timeout': '3m',  # Time before scroll results time out
         'scroll_page_size': 5000,  # Number of results per scroll page
+        'termvectors_batch_size': 100,  # Number of documents per multi-termvectors request
+        'connections_per_node': 10,  # Size of the connection pool of the client
+        'request_timeout': 60,  # Timeout of requests in seconds
         'index_prefix': 'ianalyzer'  # Prefix applied to index names created on this server
     }
 }
@@ -83,6 +86,18 @@ WORDCLOUD_LIMIT = 1000
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER', 'redis://')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_BROKER', 'redis://')
 
+# Cache for visualisation results
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'visualization': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('CELERY_BROKER', 'redis://'),
+        'TIMEOUT': 60 * 60 * 24,  # seconds
+    },
+}
+
 # url to the frontend for generating email links
 BASE_URL = 'http://localhost:4200'
 
@@ -22,6 +22,11 @@ UBLAD_DATA = '' # necessary to make ublad test not fail
 
 SERVERS['default']['index_prefix'] = 'test'
 
+CACHES['visualization'] = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'visualization',
+}
+
 REST_FRAMEWORK.update(
     {
         "DEFAULT_THROTTLE_RATES": {
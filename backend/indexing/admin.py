@@ -12,11 +12,20 @@ class CreateIndexAdmin(admin.StackedInline):
 class PopulateIndexAdmin(admin.StackedInline):
     model = models.PopulateIndexTask
     extra = 0
+    readonly_fields = models.PopulateIndexTask.PROGRESS_FIELDS + [
+        'current_source', 'sources_total',
+    ]
 
 
 class UpdateIndexAdmin(admin.StackedInline):
     model = models.UpdateIndexTask
     extra = 0
+    readonly_fields = models.UpdateIndexTask.PROGRESS_FIELDS
+
+
+class ForceMergeAdmin(admin.StackedInline):
+    model = models.ForceMergeTask
+    extra = 0
 
 
 class UpdateSettingsAdmin(admin.StackedInline):
@@ -48,6 +57,7 @@ class IndexJobAdmin(admin.ModelAdmin):
         CreateIndexAdmin,
         PopulateIndexAdmin,
         UpdateIndexAdmin,
+        ForceMergeAdmin,
         UpdateSettingsAdmin,
         RemoveAliasAdmin,
         AddAliasAdmin,
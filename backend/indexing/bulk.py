@@ -0,0 +1,294 @@
+'''
+Sending documents to elasticsearch in bulk requests.
+
+`AdaptiveBulkSender` is used instead of the bulk helpers of the elasticsearch client.
+Corpora range from small metadata records to book chapters of several megabytes, so a
+fixed number of documents per request does not suit all of them. The sender adjusts
+the chunk size based on the latency of requests, and backs off when elasticsearch
+rejects requests because its queues are full (status 429).
+
+Documents that could not be indexed can be written to a dead letter file, so they can
+be indexed later with the `indexdeadletters` command.
+'''
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import os
+from threading import Lock
+from time import monotonic, sleep
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from django.conf import settings
+from elasticsearch import ApiError, Elasticsearch
+from elasticsearch.helpers import expand_action
+
+logger = logging.getLogger('indexing')
+
+MIN_CHUNK_SIZE = 10
+'Minimum number of documents per bulk request'
+
+MAX_CHUNK_SIZE_FACTOR = 4
+'The chunk size can grow to this multiple of the initial chunk size'
+
+TARGET_LATENCY = 5
+'Target duration of a bulk request in seconds'
+
+MAX_RETRIES = 8
+'Maximum number of retries for rejected (429) requests or documents'
+
+INITIAL_BACKOFF = 2
+'Time (in seconds) to wait before the first retry; doubled for each retry'
+
+MAX_BACKOFF = 300
+'Maximum time (in seconds) to wait before a retry'
+
+BulkResult = Tuple[bool, Dict[str, Any]]
+
+Chunk = List[Tuple[Dict, Optional[Dict], List[bytes]]]
+'A chunk of actions: for each action, the header, the body and the serialised lines'
+
+
+class AdaptiveBulkSender:
+    '''
+    Sends actions to elasticsearch in bulk requests, adapting the number of actions
+    per request to the observed latency.
+
+    - If a request takes longer than `target_latency`, the chunk size is reduced.
+    - If a request takes less than half of `target_latency`, the chunk size is
+    increased (up to `max_chunk_size`).
+    - If elasticsearch rejects a request or some of its documents with status 429,
+    the chunk size is halved, and the rejected actions are retried after a backoff.
+
+    Chunks never exceed `max_chunk_bytes`. With `threads > 1`, chunks are sent
+    concurrently. If `on_serialized` is given, it is called with the size in bytes of
+    each action after it is serialised (e.g. to report progress).
+
+    Use `send()` like `elasticsearch.helpers.streaming_bulk` with
+    `raise_on_error=False` and `raise_on_exception=False`: it yields a
+    `(success, info)` tuple for each action, in the same order as the input. For
+    failed actions, the info includes the body of the action under `'data'`.
+    '''
+
+    def __init__(
+        self,
+        client: Elasticsearch,
+        chunk_size: int,
+        max_chunk_bytes: int,
+        threads: int = 1,
+        queue_size: int = 4,
+        min_chunk_size: int = MIN_CHUNK_SIZE,
+        max_chunk_size: Optional[int] = None,
+        target_latency: float = TARGET_LATENCY,
+        max_retries: int = MAX_RETRIES,
+        initial_backoff: float = INITIAL_BACKOFF,
+        max_backoff: float = MAX_BACKOFF,
+        on_serialized: Optional[Callable[[int], None]] = None,
+    ):
+        self.client = client
+        self.serializer = client.transport.serializers.get_serializer('application/json')
+        self.max_chunk_bytes = max_chunk_bytes
+        self.threads = threads
+        self.queue_size = queue_size
+        self.min_chunk_size = min(min_chunk_size, chunk_size)
+        self.max_chunk_size = max_chunk_size or chunk_size * MAX_CHUNK_SIZE_FACTOR
+        self.chunk_size = chunk_size
+        self.target_latency = target_latency
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.on_serialized = on_serialized
+        self._lock = Lock()
+
+    def send(self, actions: Iterable[Dict]) -> Iterator[BulkResult]:
+        chunks = self._chunks(actions)
+
+        if self.threads <= 1:
+            for chunk in chunks:
+                yield from self._send_chunk(chunk)
+            return
+
+        max_pending = self.threads + self.queue_size
+        with ThreadPoolExecutor(self.threads) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(self._send_chunk, chunk))
+                if len(pending) >= max_pending:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    def _chunks(self, actions: Iterable[Dict]) -> Iterator[Chunk]:
+        chunk = []
+        size = 0
+        for action in actions:
+            header, body = expand_action(action)
+            lines = [self._dumps(header)]
+            if body is not None:
+                lines.append(self._dumps(body))
+            # +1 for each trailing newline
+            action_size = sum(len(line) + 1 for line in lines)
+            if self.on_serialized:
+                self.on_serialized(action_size)
+
+            if chunk and (
+                len(chunk) >= self.chunk_size
+                or size + action_size > self.max_chunk_bytes
+            ):
+                yield chunk
+                chunk = []
+                size = 0
+
+            chunk.append((header, body, lines))
+            size += action_size
+
+        if chunk:
+            yield chunk
+
+    def _dumps(self, data) -> bytes:
+        serialized = self.serializer.dumps(data)
+        if isinstance(serialized, str):
+            return serialized.encode('utf-8')
+        return serialized
+
+    def _send_chunk(self, chunk: Chunk) -> List[BulkResult]:
+        results: List[Optional[BulkResult]] = [None] * len(chunk)
+        pending = list(range(len(chunk)))
+        attempt = 0
+
+        while pending:
+            operations = [line for i in pending for line in chunk[i][2]]
+            start = monotonic()
+            try:
+                response = self.client.bulk(operations=operations)
+            except ApiError as error:
+                if error.status_code == 429 and attempt < self.max_retries:
+                    self._rejected()
+                    self._backoff(attempt)
+                    attempt += 1
+                    continue
+                for i in pending:
+                    results[i] = _error_result(chunk[i], error)
+                break
+
+            latency = monotonic() - start
+            retry = []
+            for i, item in zip(pending, response['items']):
+                op_type, details = item.copy().popitem()
+                status = details.get('status', 500)
+                if status == 429 and attempt < self.max_retries:
+                    retry.append(i)
+                    continue
+                ok = 200 <= status < 300
+                if not ok:
+                    details = {**details, 'data': chunk[i][1]}
+                results[i] = (ok, {op_type: details})
+
+            if retry:
+                self._rejected()
+                self._backoff(attempt)
+                attempt += 1
+            else:
+                self._adjust(latency, len(pending))
+            pending = retry
+
+        return results
+
+    def _backoff(self, attempt: int) -> None:
+        sleep(min(self.initial_backoff * 2 ** attempt, self.max_backoff))
+
+    def _rejected(self) -> None:
+        with self._lock:
+            self._set_chunk_size(self.chunk_size // 2)
+
+    def _adjust(self, latency: float, n_actions: int) -> None:
+        with self._lock:
+            if latency > self.target_latency:
+                self._set_chunk_size(int(min(self.chunk_size, n_actions) * 0.8))
+            elif latency < self.target_latency / 2 and n_actions >= self.chunk_size:
+                # only grow if the chunk was not limited by max_chunk_bytes or the
+                # end of the input
+                self._set_chunk_size(int(self.chunk_size * 1.25) + 1)
+
+    def _set_chunk_size(self, chunk_size: int) -> None:
+        chunk_size = max(self.min_chunk_size, min(self.max_chunk_size, chunk_size))
+        if chunk_size != self.chunk_size:
+            logger.debug(f'Bulk chunk size: {self.chunk_size} -> {chunk_size}')
+            self.chunk_size = chunk_size
+
+
+def _error_result(action: Tuple[Dict, Optional[Dict], List[bytes]], error: ApiError) -> BulkResult:
+    header, body, _ = action
+    op_type, metadata = header.copy().popitem()
+    info = {'error': str(error), 'status': error.status_code, **metadata}
+    if body is not None:
+        info['data'] = body
+    return False, {op_type: info}
+
+
+def dead_letter_path(name: str) -> Optional[str]:
+    '''
+    Path for a dead letter file, based on the INDEXING_DEAD_LETTER_DIRECTORY setting.
+    Returns `None` if the setting is not configured.
+    '''
+    directory = getattr(settings, 'INDEXING_DEAD_LETTER_DIRECTORY', None)
+    if directory:
+        return os.path.join(directory, f'{name}.jsonl')
+
+
+class DeadLetterFile:
+    '''
+    Writes failed bulk actions to a file (one JSON object per line), so they can be
+    sent again later. The file is only created if there are failures.
+
+    If `path` is `None`, failures are only counted.
+    '''
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.count = 0
+        self._file = None
+
+    def write(self, info: Dict[str, Any]) -> None:
+        self.count += 1
+        if not self.path:
+            return
+        if not self._file:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._file = open(self.path, 'a')
+            logger.warning(f'Writing failed documents to {self.path}')
+        self._file.write(json.dumps(info, default=str) + '\n')
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read_dead_letters(path: str) -> Iterator[Dict]:
+    '''
+    Read a dead letter file and return bulk actions to retry the failed documents.
+    '''
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            op_type, details = json.loads(line).popitem()
+            action = {'_op_type': op_type, '_index': details['_index']}
+            if details.get('_id') is not None:
+                action['_id'] = details['_id']
+            data = details.get('data')
+            if data is None and op_type != 'delete':
+                logger.warning(f'Dead letter without data: {details}')
+                continue
+            if op_type == 'update':
+                action.update(data)
+            elif data is not None:
+                action['_source'] = data
+            yield action
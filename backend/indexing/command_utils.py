@@ -5,7 +5,10 @@ Shared functions for django-admin commands
 from argparse import ArgumentParser
 
 from indexing.models import IndexJob
-from indexing.run_job import perform_indexing, perform_indexing_async, mark_tasks_stopped
+from indexing.run_job import (
+    perform_indexing, perform_indexing_async, mark_tasks_stopped, is_resumable,
+    mark_tasks_resumed
+)
 
 def add_create_only_argument(parser: ArgumentParser) -> None:
     parser.add_argument(
@@ -33,3 +36,17 @@ def run_job(job: IndexJob, run_async: bool):
         except KeyboardInterrupt as e:
             print('Aborting tasks...')
             mark_tasks_stopped(job)
+
+
+def resume_job(job: IndexJob, run_async: bool):
+    '''
+    Resume a job that failed or was stopped. Completed tasks are skipped, and populate
+    tasks continue from their last checkpoint.
+    '''
+    if not is_resumable(job):
+        print(f'Job {job.id} cannot be resumed: current status is {job.status()}')
+        return
+
+    print(f'Resuming job: {job.id}')
+    mark_tasks_resumed(job)
+    run_job(job, run_async)
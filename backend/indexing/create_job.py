@@ -11,8 +11,9 @@ from es.es_alias import (
 from es.versioning import next_version_number, highest_version_in_result, version_from_name
 from indexing.models import (
     IndexJob, CreateIndexTask, PopulateIndexTask, UpdateIndexTask,
-    RemoveAliasTask, AddAliasTask, UpdateSettingsTask, DeleteIndexTask,
+    RemoveAliasTask, AddAliasTask, UpdateSettingsTask, DeleteIndexTask, ForceMergeTask,
 )
+from indexing.run_create_task import RESET_BULK_LOAD_SETTINGS
 from es.sync import update_server_table_from_settings
 from es.models import Server, Index
 
@@ -28,6 +29,11 @@ def create_indexing_job(
     prod: bool = False,
     rollover: bool = False,
     update: bool = False,
+    extraction_processes: int = 1,
+    bulk_threads: int = 1,
+    bulk_load: bool = False,
+    force_merge: bool = False,
+    concurrent_queries: int = 1,
 ) -> IndexJob:
     '''
     Create an IndexJob to index a corpus.
@@ -37,6 +43,8 @@ def create_indexing_job(
     in detail in the documentation for the `index` command.
     '''
     create_new = not (add or update)
+    populate = not (mappings_only or update)
+    bulk_load = bulk_load and create_new and populate
 
     update_server_table_from_settings()
 
@@ -50,14 +58,17 @@ def create_indexing_job(
             index=index,
             production_settings=prod,
             delete_existing=clear,
+            bulk_load_settings=bulk_load,
         )
 
-    if not (mappings_only or update):
+    if populate:
         PopulateIndexTask.objects.create(
             job=job,
             index=index,
             document_min_date=start,
             document_max_date=end,
+            extraction_processes=extraction_processes,
+            bulk_threads=bulk_threads,
         )
 
     if update:
@@ -66,13 +77,25 @@ def create_indexing_job(
             index=index,
             document_min_date=start,
             document_max_date=end,
+            concurrent_queries=concurrent_queries,
         )
 
+    if force_merge and populate:
+        ForceMergeTask.objects.create(
+            job=job,
+            index=index,
+        )
+
+    settings = {}
+    if bulk_load:
+        settings.update(RESET_BULK_LOAD_SETTINGS)
     if prod and create_new:
+        settings.update({"number_of_replicas": 1})
+    if settings:
         UpdateSettingsTask.objects.create(
             job=job,
             index=index,
-            settings={"number_of_replicas": 1},
+            settings=settings,
         )
 
     if prod and rollover:
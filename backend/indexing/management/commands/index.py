@@ -1,12 +1,15 @@
 import logging
 from datetime import datetime
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
 
 from addcorpus.python_corpora.load_corpus import load_corpus_definition
 from addcorpus.python_corpora.save_corpus import load_all_corpus_definitions
 from addcorpus.models import Corpus
 from indexing.create_job import create_indexing_job
-from indexing.command_utils import run_job, add_create_only_argument, add_async_argument
+from indexing.command_utils import (
+    run_job, resume_job, add_create_only_argument, add_async_argument
+)
+from indexing.models import IndexJob
 
 
 class Command(BaseCommand):
@@ -88,6 +91,60 @@ class Command(BaseCommand):
                 command after indexing is complete.'''
         )
 
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='''Number of processes used to extract documents from source files.
+                Defaults to 1, which extracts documents in the main process. Using
+                more processes can speed up indexing for corpora where parsing
+                source files is slow.'''
+        )
+
+        parser.add_argument(
+            '--bulk-threads',
+            type=int,
+            default=1,
+            help='''Number of threads that send documents to elasticsearch. Defaults
+                to 1.'''
+        )
+
+        parser.add_argument(
+            '--concurrent-queries',
+            type=int,
+            default=1,
+            help='''Number of update_by_query requests that may run at the same time
+                when running an update script (see --update). Only use this if the
+                queries of the script update disjoint sets of documents; the update
+                fails on version conflicts. Defaults to 1.'''
+        )
+
+        parser.add_argument(
+            '--bulk-load',
+            action='store_true',
+            help='''Create the index with settings that speed up populating it:
+                periodic refreshing is disabled, and the translog is written
+                asynchronously. Default settings are restored after populating the
+                index. Only applicable when a new index is created and populated.'''
+        )
+
+        parser.add_argument(
+            '--force-merge',
+            action='store_true',
+            help='''Force-merge the index after populating it. This makes the index
+                smaller and faster to search, but should only be used for indices that
+                will not receive further updates.'''
+        )
+
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='''Resume the most recent index job for this corpus, if it failed or
+                was stopped, instead of creating a new job. Completed tasks are
+                skipped, and populating the index continues from the last checkpoint.
+                Other options are ignored, except --async.'''
+        )
+
         add_create_only_argument(parser)
         add_async_argument(parser, 'Cannot be used in combination with --create-only.')
 
@@ -103,11 +160,25 @@ class Command(BaseCommand):
             rollover=False,
             create_only=False,
             run_async=False,
+            processes=1,
+            bulk_threads=1,
+            concurrent_queries=1,
+            resume=False,
+            bulk_load=False,
+            force_merge=False,
             **options
         ):
         corpus_object = self._corpus_object(corpus)
         corpus_object.validate_ready_to_index()
 
+        if resume:
+            try:
+                job = IndexJob.objects.filter(corpus=corpus_object).latest('created')
+            except IndexJob.DoesNotExist:
+                raise CommandError(f'Corpus {corpus} has no index job to resume')
+            resume_job(job, run_async)
+            return
+
         corpus_definition = load_corpus_definition(corpus)
 
         self._validate_arguments(
@@ -135,7 +206,12 @@ class Command(BaseCommand):
 
         job = create_indexing_job(
             corpus_object, start_index, end_index, mappings_only, add, delete, prod,
-            rollover, update
+            rollover, update,
+            extraction_processes=processes,
+            bulk_threads=bulk_threads,
+            concurrent_queries=concurrent_queries,
+            bulk_load=bulk_load,
+            force_merge=force_merge,
         )
 
         print(f'Created IndexJob #{job.pk}')
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from es.client import elasticsearch, server_for_corpus
+from indexing.bulk import AdaptiveBulkSender, DeadLetterFile, read_dead_letters
+
+
+class Command(BaseCommand):
+    help = '''
+    Send documents from a dead letter file to elasticsearch again. Dead letter files
+    contain documents that could not be indexed while populating an index (see the
+    INDEXING_DEAD_LETTER_DIRECTORY setting).
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'corpus',
+            help='name of the corpus; determines the elasticsearch server',
+        )
+        parser.add_argument(
+            'file',
+            help='path to the dead letter file',
+        )
+        parser.add_argument(
+            '--output', '-o',
+            help='''path of a new dead letter file for documents that fail again.
+                Defaults to the input path with ".retry" appended.''',
+        )
+
+    def handle(self, corpus, file, output=None, **options):
+        server_config = settings.SERVERS[server_for_corpus(corpus)]
+        sender = AdaptiveBulkSender(
+            elasticsearch(corpus),
+            chunk_size=server_config['chunk_size'],
+            max_chunk_bytes=server_config['max_chunk_bytes'],
+        )
+
+        succeeded = 0
+        with DeadLetterFile(output or file + '.retry') as dead_letters:
+            for success, info in sender.send(read_dead_letters(file)):
+                if success:
+                    succeeded += 1
+                else:
+                    dead_letters.write(info)
+
+        self.stdout.write(f'{succeeded} documents indexed')
+        if dead_letters.count:
+            self.stdout.write(self.style.WARNING(
+                f'{dead_letters.count} documents failed; see {dead_letters.path}'
+            ))
@@ -5,7 +5,7 @@ from sys import stdout
 from django.core.management import BaseCommand
 
 from indexing.models import IndexJob, TaskStatus
-from indexing.command_utils import run_job, add_async_argument
+from indexing.command_utils import run_job, resume_job, add_async_argument
 from indexing.stop_job import is_stoppable, mark_tasks_stopped
 
 
@@ -55,6 +55,21 @@ class Command(BaseCommand):
         add_async_argument(parser_start)
         parser_start.set_defaults(handler=self.start)
 
+        parser_resume = subparsers.add_parser(
+            'resume',
+            help='Resume a job that failed or was stopped',
+            description='''Resume a job that failed or was stopped. Tasks that were
+                completed are skipped, and populate tasks continue from their last
+                checkpoint.''',
+        )
+        parser_resume.add_argument(
+            'id',
+            type=int,
+            help='ID of the job to resume',
+        )
+        add_async_argument(parser_resume)
+        parser_resume.set_defaults(handler=self.resume)
+
         parser_stop = subparsers.add_parser(
             'stop',
             help='Stop an job that is currently running',
@@ -121,6 +136,10 @@ class Command(BaseCommand):
         print(f'Starting job: {job.id}')
         run_job(job, run_async)
 
+    def resume(self, id: int, run_async=False, **options):
+        job = IndexJob.objects.get(id=id)
+        resume_job(job, run_async)
+
     def stop(self, id: int, **options):
         job = IndexJob.objects.get(id=id)
 
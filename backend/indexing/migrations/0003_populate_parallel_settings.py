@@ -0,0 +1,38 @@
+# Generated by Django 4.2.26 on 2026-10-18 12:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indexing', '0002_addaliastask_status_createindextask_status_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='populateindextask',
+            name='bulk_threads',
+            field=models.PositiveSmallIntegerField(default=1, help_text='number of threads that send bulk requests to elasticsearch'),
+        ),
+        migrations.AddField(
+            model_name='populateindextask',
+            name='chunk_size',
+            field=models.PositiveIntegerField(blank=True, help_text='number of documents per bulk request; if blank, the setting of the server is used', null=True),
+        ),
+        migrations.AddField(
+            model_name='populateindextask',
+            name='extraction_processes',
+            field=models.PositiveSmallIntegerField(default=1, help_text='number of processes that extract documents from source files; if 1, documents are extracted in the process that runs the task'),
+        ),
+        migrations.AddField(
+            model_name='populateindextask',
+            name='max_chunk_bytes',
+            field=models.PositiveIntegerField(blank=True, help_text='maximum size of a bulk request in bytes; if blank, the setting of the server is used', null=True),
+        ),
+        migrations.AddField(
+            model_name='populateindextask',
+            name='queue_size',
+            field=models.PositiveSmallIntegerField(default=4, help_text='maximum number of extracted source files and bulk chunks that may be waiting to be processed'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.26 on 2026-10-18 12:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indexing', '0003_populate_parallel_settings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='populateindextask',
+            name='documents_completed',
+            field=models.PositiveIntegerField(default=0, help_text='checkpoint: number of documents that have been indexed'),
+        ),
+        migrations.AddField(
+            model_name='populateindextask',
+            name='last_source',
+            field=models.TextField(blank=True, help_text='checkpoint: the last source file that was completed'),
+        ),
+        migrations.AddField(
+            model_name='populateindextask',
+            name='sources_completed',
+            field=models.PositiveIntegerField(default=0, help_text='checkpoint: number of source files of which all documents have been indexed; when the task is resumed, these sources are skipped'),
+        ),
+    ]
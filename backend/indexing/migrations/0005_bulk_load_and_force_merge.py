@@ -0,0 +1,33 @@
+# Generated by Django 4.2.26 on 2026-10-18 12:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('es', '0001_initial'),
+        ('indexing', '0004_populate_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='createindextask',
+            name='bulk_load_settings',
+            field=models.BooleanField(default=False, help_text='configure index settings for fast bulk loading (no periodic refresh, asynchronous translog); these should be reset after populating the index'),
+        ),
+        migrations.CreateModel(
+            name='ForceMergeTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('created', 'Created'), ('queued', 'Queued'), ('working', 'Working'), ('done', 'Done'), ('error', 'Error'), ('aborted', 'Aborted'), ('cancelled', 'Cancelled')], default='created', help_text='execution status of this task', max_length=16)),
+                ('max_num_segments', models.PositiveIntegerField(default=1, help_text='number of segments to merge to')),
+                ('index', models.ForeignKey(help_text='index on which this task is applied', on_delete=django.db.models.deletion.CASCADE, related_name='%(class)ss', to='es.index')),
+                ('job', models.ForeignKey(help_text='job in which this task is run', on_delete=django.db.models.deletion.CASCADE, related_name='%(class)ss', to='indexing.indexjob')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
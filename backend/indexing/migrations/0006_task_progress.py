@@ -0,0 +1,58 @@
+# Generated by Django 4.2.26 on 2026-10-18 12:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indexing', '0005_bulk_load_and_force_merge'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='populateindextask',
+            name='bytes_per_second',
+            field=models.FloatField(blank=True, help_text='average throughput in bytes per second', null=True),
+        ),
+        migrations.AddField(
+            model_name='populateindextask',
+            name='current_source',
+            field=models.TextField(blank=True, help_text='source file that is currently being processed'),
+        ),
+        migrations.AddField(
+            model_name='populateindextask',
+            name='documents_failed',
+            field=models.PositiveIntegerField(default=0, help_text='number of documents that could not be processed'),
+        ),
+        migrations.AddField(
+            model_name='populateindextask',
+            name='documents_per_second',
+            field=models.FloatField(blank=True, help_text='average throughput in documents per second', null=True),
+        ),
+        migrations.AddField(
+            model_name='populateindextask',
+            name='estimated_completion',
+            field=models.DateTimeField(blank=True, help_text='estimated time of completion (if available)', null=True),
+        ),
+        migrations.AddField(
+            model_name='populateindextask',
+            name='progress_updated',
+            field=models.DateTimeField(blank=True, help_text='time when the progress was last updated', null=True),
+        ),
+        migrations.AddField(
+            model_name='populateindextask',
+            name='sources_total',
+            field=models.PositiveIntegerField(blank=True, help_text='total number of source files (if known)', null=True),
+        ),
+        migrations.AddField(
+            model_name='populateindextask',
+            name='timings',
+            field=models.JSONField(blank=True, default=dict, help_text='time in seconds spent on each phase of the task'),
+        ),
+        migrations.AlterField(
+            model_name='populateindextask',
+            name='documents_completed',
+            field=models.PositiveIntegerField(default=0, help_text='number of documents that have been processed'),
+        ),
+    ]
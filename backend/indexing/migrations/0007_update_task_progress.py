@@ -0,0 +1,48 @@
+# Generated by Django 4.2.26 on 2026-10-18 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indexing', '0006_task_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='updateindextask',
+            name='bytes_per_second',
+            field=models.FloatField(blank=True, help_text='average throughput in bytes per second', null=True),
+        ),
+        migrations.AddField(
+            model_name='updateindextask',
+            name='documents_completed',
+            field=models.PositiveIntegerField(default=0, help_text='number of documents that have been processed'),
+        ),
+        migrations.AddField(
+            model_name='updateindextask',
+            name='documents_failed',
+            field=models.PositiveIntegerField(default=0, help_text='number of documents that could not be processed'),
+        ),
+        migrations.AddField(
+            model_name='updateindextask',
+            name='documents_per_second',
+            field=models.FloatField(blank=True, help_text='average throughput in documents per second', null=True),
+        ),
+        migrations.AddField(
+            model_name='updateindextask',
+            name='estimated_completion',
+            field=models.DateTimeField(blank=True, help_text='estimated time of completion (if available)', null=True),
+        ),
+        migrations.AddField(
+            model_name='updateindextask',
+            name='progress_updated',
+            field=models.DateTimeField(blank=True, help_text='time when the progress was last updated', null=True),
+        ),
+        migrations.AddField(
+            model_name='updateindextask',
+            name='timings',
+            field=models.JSONField(blank=True, default=dict, help_text='time in seconds spent on each phase of the task'),
+        ),
+    ]
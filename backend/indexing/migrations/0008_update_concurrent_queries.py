@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-18 12:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indexing', '0007_update_task_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='updateindextask',
+            name='concurrent_queries',
+            field=models.PositiveSmallIntegerField(default=1, help_text='number of update_by_query requests that may run at the same time (only used for corpora with an update script)'),
+        ),
+    ]
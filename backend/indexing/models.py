@@ -57,6 +57,7 @@ class IndexJob(models.Model):
         - `CreateIndexTask`
         - `PopulateIndexTask`
         - `UpdateIndexTask`
+        - `ForceMergeTask`
         - `UpdateSettingsTask`
         - `RemoveAliasTask`
         - `AddAliasTask`
@@ -75,6 +76,7 @@ class IndexJob(models.Model):
             self.createindextasks.all(),
             self.populateindextasks.all(),
             self.updateindextasks.all(),
+            self.forcemergetasks.all(),
             self.updatesettingstasks.all(),
             self.removealiastasks.all(),
             self.addaliastasks.all(),
@@ -136,10 +138,59 @@ class IndexTask(models.Model):
         return elasticsearch(self.corpus.name)
 
     def is_aborted(self) -> bool:
-        self.refresh_from_db()
+        self.refresh_from_db(fields=['status'])
         return self.status in [TaskStatus.CANCELLED, TaskStatus.ABORTED]
 
 
+class TaskProgressFields(models.Model):
+    '''
+    Abstract model with fields to report the progress of tasks that send documents to
+    elasticsearch. See `indexing.progress`.
+    '''
+
+    class Meta:
+        abstract = True
+
+    documents_completed = models.PositiveIntegerField(
+        default=0,
+        help_text='number of documents that have been processed',
+    )
+    documents_failed = models.PositiveIntegerField(
+        default=0,
+        help_text='number of documents that could not be processed',
+    )
+    documents_per_second = models.FloatField(
+        blank=True,
+        null=True,
+        help_text='average throughput in documents per second',
+    )
+    bytes_per_second = models.FloatField(
+        blank=True,
+        null=True,
+        help_text='average throughput in bytes per second',
+    )
+    estimated_completion = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text='estimated time of completion (if available)',
+    )
+    timings = models.JSONField(
+        blank=True,
+        default=dict,
+        help_text='time in seconds spent on each phase of the task',
+    )
+    progress_updated = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text='time when the progress was last updated',
+    )
+
+    PROGRESS_FIELDS = [
+        'documents_completed', 'documents_failed', 'documents_per_second',
+        'bytes_per_second', 'estimated_completion', 'timings', 'progress_updated',
+    ]
+
+
 class CreateIndexTask(IndexTask):
     '''
     Create a new index based on corpus settings.
@@ -154,11 +205,17 @@ class CreateIndexTask(IndexTask):
         help_text='if an index by this name already exists, delete it, instead of '
             'raising an exception'
     )
+    bulk_load_settings = models.BooleanField(
+        default=False,
+        help_text='configure index settings for fast bulk loading (no periodic '
+            'refresh, asynchronous translog); these should be reset after '
+            'populating the index',
+    )
 
     def __str__(self):
         return f'create {self.index} based on {self.corpus}'
 
-class PopulateIndexTask(IndexTask):
+class PopulateIndexTask(TaskProgressFields, IndexTask):
     '''
     Extract documents from a corpus and add them to the index.
     '''
@@ -173,12 +230,56 @@ class PopulateIndexTask(IndexTask):
         null=True,
         help_text='maximum date on which to filter documents'
     )
+    extraction_processes = models.PositiveSmallIntegerField(
+        default=1,
+        help_text='number of processes that extract documents from source files; if '
+            '1, documents are extracted in the process that runs the task',
+    )
+    bulk_threads = models.PositiveSmallIntegerField(
+        default=1,
+        help_text='number of threads that send bulk requests to elasticsearch',
+    )
+    queue_size = models.PositiveSmallIntegerField(
+        default=4,
+        help_text='maximum number of extracted source files and bulk chunks that may '
+            'be waiting to be processed',
+    )
+    chunk_size = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        help_text='number of documents per bulk request; if blank, the setting of '
+            'the server is used',
+    )
+    max_chunk_bytes = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        help_text='maximum size of a bulk request in bytes; if blank, the setting of '
+            'the server is used',
+    )
+    sources_completed = models.PositiveIntegerField(
+        default=0,
+        help_text='checkpoint: number of source files of which all documents have '
+            'been indexed; when the task is resumed, these sources are skipped',
+    )
+    last_source = models.TextField(
+        blank=True,
+        help_text='checkpoint: the last source file that was completed',
+    )
+    current_source = models.TextField(
+        blank=True,
+        help_text='source file that is currently being processed',
+    )
+    sources_total = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        help_text='total number of source files (if known)',
+    )
 
     def __str__(self):
         return f'populate {self.index} based on {self.corpus}'
 
 
-class UpdateIndexTask(IndexTask):
+class UpdateIndexTask(TaskProgressFields, IndexTask):
     '''
     Run an update script; usually to add/change field values in existing documents.
 
@@ -196,12 +297,32 @@ class UpdateIndexTask(IndexTask):
         null=True,
         help_text='maximum date on which to filter documents'
     )
+    concurrent_queries = models.PositiveSmallIntegerField(
+        default=1,
+        help_text='number of update_by_query requests that may run at the same time '
+            '(only used for corpora with an update script)',
+    )
 
     def __str__(self):
         return f'update {self.index} based on {self.corpus}'
 
 
 
+class ForceMergeTask(IndexTask):
+    '''
+    Force-merge the segments of an index; useful after populating an index that will
+    not receive further updates.
+    '''
+
+    max_num_segments = models.PositiveIntegerField(
+        default=1,
+        help_text='number of segments to merge to',
+    )
+
+    def __str__(self):
+        return f'force merge {self.index}'
+
+
 class UpdateSettingsTask(IndexTask):
     '''
     Push new settings to an index
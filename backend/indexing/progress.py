@@ -0,0 +1,304 @@
+'''
+Progress reporting for long-running index tasks, and checkpoints for populate tasks, so
+they can be resumed after an interruption.
+'''
+
+from collections import deque
+from datetime import timedelta
+import logging
+from time import monotonic
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+from django.utils import timezone
+
+from indexing.models import IndexTask, PopulateIndexTask
+
+logger = logging.getLogger('indexing')
+
+PROGRESS_INTERVAL = 30
+'Minimum time (in seconds) between saving progress'
+
+MAX_SOURCE_DESCRIPTION_LENGTH = 512
+
+
+def describe_source(source: Any) -> str:
+    '''
+    Short description of a source, for display. Sources are usually a file path, or a
+    tuple of a file path and metadata.
+    '''
+    if isinstance(source, tuple) and len(source):
+        source = source[0]
+    return str(source)[:MAX_SOURCE_DESCRIPTION_LENGTH]
+
+
+class TaskProgress:
+    '''
+    Keeps track of the progress of a task that sends documents to elasticsearch, and
+    periodically saves it on the task (see `models.TaskProgressFields`).
+
+    Iterate over documents with `documents()`, and call `document_done()` for each
+    bulk result. The size of the data that is sent is counted with `add_bytes()`,
+    which can be used as the `on_serialized` callback of an `AdaptiveBulkSender`. If `documents_total` is given, the completion time is estimated from
+    the number of documents.
+
+    Progress also includes the time spent in each phase of the task:
+    - `read`: iterating over sources (only if the sources are wrapped in `timed()`)
+    - `extract`: waiting for documents, excluding reading sources
+    - `send`: the rest of the time, i.e. mainly waiting for bulk requests. With
+    parallel bulk requests, documents are consumed in a separate thread, so the
+    phases will overlap.
+    '''
+
+    def __init__(
+        self, task: IndexTask, interval: float = PROGRESS_INTERVAL,
+        documents_total: Optional[int] = None,
+    ):
+        self.task = task
+        self.interval = interval
+        self.documents_total = documents_total
+        self.documents_completed = task.documents_completed
+        self.documents_failed = task.documents_failed
+        self.bytes_sent = 0
+        self.start_count = task.documents_completed
+        self.start_time = monotonic()
+        self.last_save = self.start_time
+        self.read_time = 0.0
+        self.wait_time = 0.0
+
+    def timed(self, sources: Iterable) -> Iterator:
+        '''
+        Iterate over sources, recording the time spent reading them.
+        '''
+        iterator = iter(sources)
+        while True:
+            start = monotonic()
+            try:
+                source = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.read_time += monotonic() - start
+            yield source
+
+    def documents(self, documents: Iterable[Dict]) -> Iterator[Dict]:
+        '''
+        Iterate over documents, recording the time spent waiting for them.
+        '''
+        iterator = iter(documents)
+        while True:
+            start = monotonic()
+            try:
+                document = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.wait_time += monotonic() - start
+            yield document
+
+    def add_bytes(self, n_bytes: int) -> None:
+        self.bytes_sent += n_bytes
+
+    def document_done(self, success: bool = True) -> None:
+        self.documents_completed += 1
+        if not success:
+            self.documents_failed += 1
+
+        if monotonic() - self.last_save >= self.interval:
+            self.save()
+
+    def timings(self) -> Dict[str, float]:
+        total = monotonic() - self.start_time
+        return {
+            'read': round(self.read_time, 3),
+            'extract': round(max(self.wait_time - self.read_time, 0), 3),
+            'send': round(max(total - self.wait_time, 0), 3),
+        }
+
+    def documents_per_second(self) -> Optional[float]:
+        elapsed = monotonic() - self.start_time
+        if elapsed > 0:
+            return (self.documents_completed - self.start_count) / elapsed
+
+    def bytes_per_second(self) -> Optional[float]:
+        elapsed = monotonic() - self.start_time
+        if elapsed > 0:
+            return self.bytes_sent / elapsed
+
+    def estimated_completion(self):
+        '''Estimated completion time; `None` if there is no estimate.'''
+        if not self.documents_total:
+            return None
+        return _estimate(
+            self.start_time, self.documents_completed - self.start_count,
+            self.documents_total - self.documents_completed,
+        )
+
+    def values(self) -> Dict:
+        '''Values of the progress fields on the task'''
+        return {
+            'documents_completed': self.documents_completed,
+            'documents_failed': self.documents_failed,
+            'documents_per_second': self.documents_per_second(),
+            'bytes_per_second': self.bytes_per_second(),
+            'estimated_completion': self.estimated_completion(),
+            'timings': self.timings(),
+            'progress_updated': timezone.now(),
+        }
+
+    def save(self) -> None:
+        values = self.values()
+        # update() rather than save(), so the status of the task is not overwritten
+        type(self.task).objects.filter(pk=self.task.pk).update(**values)
+        for field, value in values.items():
+            setattr(self.task, field, value)
+        self.last_save = monotonic()
+        self.log()
+
+    def log(self) -> None:
+        docs_per_second = self.task.documents_per_second or 0
+        kb_per_second = (self.task.bytes_per_second or 0) / 1024
+        logger.info(
+            f'{self.task}: {self.documents_completed} documents completed '
+            f'({self.documents_failed} failed), {docs_per_second:.1f} documents/s, '
+            f'{kb_per_second:.1f} kB/s, time per phase (s): {self.task.timings}'
+        )
+
+
+class SourceCheckpoint(TaskProgress):
+    '''
+    Progress of a populate task, which also keeps track of the sources of which all
+    documents have been sent to elasticsearch. This is saved as a checkpoint on the
+    task, so the task can be resumed.
+
+    Use `documents()` on `(index, source, documents)` tuples. Bulk results must arrive
+    in the same order as the documents.
+
+    The checkpoint only advances past sources of which all documents were indexed
+    successfully. After a document fails, the checkpoint stays at the last source
+    before it, so a resumed task retries the failed documents.
+    '''
+
+    def __init__(
+        self, task: PopulateIndexTask, interval: float = PROGRESS_INTERVAL,
+        sources_total: Optional[int] = None,
+    ):
+        super().__init__(task, interval)
+        self.sources_completed = task.sources_completed
+        self.last_source = task.last_source
+        self.current_source = task.current_source
+        self.sources_total = sources_total
+        self.start_sources = task.sources_completed
+        self.documents_queued = task.documents_completed
+        # (documents queued at the end of the source, index, source)
+        self.pending = deque()
+        self.has_failures = False
+
+    def documents(
+        self, extracted_sources: Iterable[Tuple[int, Any, Iterable[Dict]]]
+    ) -> Iterator[Dict]:
+        '''
+        Iterate over the documents of `(index, source, documents)` tuples, recording
+        where each source ends.
+        '''
+        return super().documents(self._source_documents(extracted_sources))
+
+    def _source_documents(self, extracted_sources):
+        for index, source, documents in extracted_sources:
+            self.current_source = describe_source(source)
+            for document in documents:
+                self.documents_queued += 1
+                yield document
+            self.pending.append((self.documents_queued, index, source))
+
+    def document_done(self, success: bool = True) -> None:
+        document_number = self.documents_completed + 1
+        # sources that ended before this document
+        while self.pending and self.pending[0][0] < document_number:
+            self._complete_source()
+        if not success and not self.has_failures:
+            self.has_failures = True
+            logger.warning(
+                f'{self.task}: document failed; checkpoint will not advance past '
+                f'{self.last_source}'
+            )
+        # sources that end with this document
+        while self.pending and self.pending[0][0] <= document_number:
+            self._complete_source()
+        super().document_done(success)
+
+    def finish(self) -> None:
+        '''
+        Mark all sources as completed. Call this when all documents have been sent.
+        '''
+        while self.pending:
+            self._complete_source()
+
+    def _complete_source(self):
+        _, index, source = self.pending.popleft()
+        if self.has_failures:
+            return
+        self.sources_completed = index + 1
+        self.last_source = describe_source(source)
+
+    def estimated_completion(self):
+        if not self.sources_total:
+            return None
+        return _estimate(
+            self.start_time, self.sources_completed - self.start_sources,
+            self.sources_total - self.sources_completed,
+        )
+
+    def values(self) -> Dict:
+        return {
+            **super().values(),
+            'sources_completed': self.sources_completed,
+            'last_source': self.last_source,
+            'current_source': self.current_source,
+            'sources_total': self.sources_total,
+        }
+
+
+class QueryProgress(TaskProgress):
+    '''
+    Progress of a task that runs update_by_query requests as tasks in elasticsearch.
+
+    Instead of counting documents one by one, call `update()` with the status of each
+    elasticsearch task. Documents are completed when they are updated, deleted, or
+    not changed (noop); version conflicts and failures count as failed.
+    '''
+
+    def __init__(self, task: IndexTask, interval: float = PROGRESS_INTERVAL):
+        super().__init__(task, interval)
+        self.start_failed = task.documents_failed
+        # elasticsearch task ID -> (completed, failed)
+        self.counts: Dict[str, Tuple[int, int]] = {}
+
+    def update(self, es_task_id: str, response: Dict) -> None:
+        '''
+        Update the counts of an elasticsearch task, based on the response of the
+        tasks API.
+        '''
+        status = response['task']['status']
+        completed = status['updated'] + status['deleted'] + status['noops']
+        failed = status['version_conflicts'] + len(
+            response.get('response', {}).get('failures', [])
+        )
+        self.counts[es_task_id] = (completed, failed)
+
+        self.documents_completed = self.start_count + sum(
+            c for c, _ in self.counts.values())
+        self.documents_failed = self.start_failed + sum(
+            f for _, f in self.counts.values())
+
+        if monotonic() - self.last_save >= self.interval:
+            self.save()
+
+
+def _estimate(start_time: float, done: int, remaining: int):
+    '''
+    Estimate the completion time, assuming the remaining items take as long as the
+    items done since `start_time`.
+    '''
+    if done <= 0:
+        return None
+    elapsed = monotonic() - start_time
+    return timezone.now() + timedelta(seconds=elapsed / done * max(remaining, 0))
@@ -11,12 +11,13 @@ from celery.contrib.abortable import AbortableTask
 from es.client import elasticsearch
 from indexing.models import (
     IndexJob, IndexTask, TaskStatus, CreateIndexTask, PopulateIndexTask,
-    UpdateSettingsTask, RemoveAliasTask, AddAliasTask, DeleteIndexTask, UpdateIndexTask
+    UpdateSettingsTask, RemoveAliasTask, AddAliasTask, DeleteIndexTask, UpdateIndexTask,
+    ForceMergeTask,
 )
 from indexing.run_populate_task import populate
 from indexing.run_create_task import create
 from indexing.run_management_tasks import (
-    update_index_settings, remove_alias, add_alias, delete_index
+    update_index_settings, remove_alias, add_alias, delete_index, force_merge
 )
 from indexing.run_update_task import run_update_task
 from ianalyzer.celery_utils import warn_if_no_worker
@@ -29,6 +30,7 @@ TASK_HANDLERS: Dict[Type[IndexTask], Callable[[IndexTask], None]] = {
     CreateIndexTask: create,
     PopulateIndexTask: populate,
     UpdateIndexTask: run_update_task,
+    ForceMergeTask: force_merge,
     UpdateSettingsTask: update_index_settings,
     RemoveAliasTask: remove_alias,
     AddAliasTask: add_alias,
@@ -86,13 +88,13 @@ def start_job(job: IndexJob) -> None:
         mark_tasks_stopped(job)
         return
 
-    for task in job.tasks():
+    for task in _tasks_to_run(job):
         task.status = TaskStatus.QUEUED
         task.save()
 
 
 def job_chain(job: IndexJob) -> celery.chain:
-    signatures = [start_job.si(job)] + [run_task.si(task) for task in job.tasks()]
+    signatures = [start_job.si(job)] + [run_task.si(task) for task in _tasks_to_run(job)]
     return celery.chain(signatures).on_error(handle_job_error.s(job))
 
 
@@ -115,9 +117,38 @@ def perform_indexing_async(job: IndexJob) -> AsyncResult:
     return chain.apply_async()
 
 
+def is_resumable(job: IndexJob) -> bool:
+    '''
+    Whether a job can be resumed: it was stopped or failed, and none of its tasks are
+    still running.
+    '''
+    statuses = set(task.status for task in job.tasks())
+    stopped = {TaskStatus.ERROR, TaskStatus.ABORTED, TaskStatus.CANCELLED}
+    running = {TaskStatus.QUEUED, TaskStatus.WORKING}
+    return bool(statuses & stopped) and not (statuses & running)
+
+
+def mark_tasks_resumed(job: IndexJob):
+    '''
+    Reset the status of tasks that failed or were stopped, so the job can be started
+    again. Tasks that were completed are skipped when the job is started. Populate
+    tasks keep their checkpoint, so they continue where they stopped.
+    '''
+    stopped = [TaskStatus.ERROR, TaskStatus.ABORTED, TaskStatus.CANCELLED]
+    for task_set in job.task_query_sets():
+        task_set.filter(status__in=stopped).update(status=TaskStatus.CREATED)
+
+
+def _tasks_to_run(job: IndexJob):
+    return [task for task in job.tasks() if task.status != TaskStatus.DONE]
+
+
 def _validate_job_start(job: IndexJob):
     '''Validation that should be run before starting an IndexJob'''
-    assert job.status() == TaskStatus.CREATED
+    statuses = set(task.status for task in job.tasks())
+    # a resumed job can contain tasks that are already done
+    assert TaskStatus.CREATED in statuses
+    assert statuses.issubset({TaskStatus.CREATED, TaskStatus.DONE})
     job.corpus.validate_ready_to_index()
 
 
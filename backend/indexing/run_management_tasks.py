@@ -2,9 +2,17 @@
 Functionality to run indexing tasks too straightforward to warrant a separate module
 '''
 
+from time import sleep
+from typing import Dict, Optional
+from elasticsearch import Elasticsearch
+
 from indexing.models import (
-    DeleteIndexTask, RemoveAliasTask, AddAliasTask, UpdateSettingsTask,
+    DeleteIndexTask, RemoveAliasTask, AddAliasTask, UpdateSettingsTask, ForceMergeTask,
 )
+from indexing.stop_job import AbortChecker
+
+ES_TASK_POLL_INTERVAL = 10
+'Time (in seconds) between status requests for a running elasticsearch task'
 
 
 def add_alias(task: AddAliasTask):
@@ -48,5 +56,55 @@ def update_index_settings(task: UpdateSettingsTask):
     )
 
 
+def wait_for_es_task(
+    client: Elasticsearch, es_task_id: str,
+    abort_checker: Optional[AbortChecker] = None,
+    interval: float = ES_TASK_POLL_INTERVAL,
+) -> Dict:
+    '''
+    Wait until a task in elasticsearch (e.g. a request made with
+    `wait_for_completion=False`) is completed, and return its status.
 
+    The status is polled with short requests, so long-running tasks are not affected
+    by request timeouts. If an `abort_checker` is provided, it is checked after each
+    poll.
 
+    Raises a `RuntimeError` if the task reports an error or failures.
+    '''
+    while True:
+        response = client.tasks.get(task_id=es_task_id)
+        if response['completed']:
+            if response.get('error'):
+                raise RuntimeError(
+                    f'Elasticsearch task {es_task_id} failed: {response["error"]}'
+                )
+            failures = response.get('response', {}).get('failures')
+            if failures:
+                raise RuntimeError(
+                    f'Elasticsearch task {es_task_id} completed with failures: '
+                    f'{failures}'
+                )
+            return response
+        if abort_checker:
+            abort_checker.check()
+        sleep(interval)
+
+
+def force_merge(task: ForceMergeTask):
+    '''
+    Force-merge an Elasticsearch index, as defined by a ForceMergeTask.
+
+    Merging can take a long time for large indices, so the request does not wait for
+    completion; instead, the task status is polled until the merge is done.
+
+    The index is refreshed first, since a bulk-loaded index may still have buffered
+    documents; otherwise these would be written to new segments after the merge.
+    '''
+    client = task.client()
+    client.indices.refresh(index=task.index.name)
+    response = client.indices.forcemerge(
+        index=task.index.name,
+        max_num_segments=task.max_num_segments,
+        wait_for_completion=False,
+    )
+    wait_for_es_task(client, response['task'], AbortChecker(task))
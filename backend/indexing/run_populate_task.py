@@ -1,16 +1,32 @@
+from collections import deque
+from itertools import islice
 import logging
-import elasticsearch.helpers as es_helpers
+import multiprocessing
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sized, Tuple
+from django.db import connections
+from ianalyzer_readers.readers.core import Reader
 
 from addcorpus.reader import make_reader
-from indexing.models import PopulateIndexTask
-from indexing.stop_job import raise_if_aborted
+from indexing.bulk import AdaptiveBulkSender, DeadLetterFile, dead_letter_path
+from indexing.models import IndexTask, PopulateIndexTask
+from indexing.progress import SourceCheckpoint
+from indexing.stop_job import AbortChecker
 
 logger = logging.getLogger('indexing')
 
+# reader used by extraction processes; set before the process pool is forked
+_extraction_reader: Optional[Reader] = None
+
+# database connections that an extraction process inherited from its parent
+_inherited_connections = []
+
 
 def populate(task: PopulateIndexTask):
     '''
     Populate an ElasticSearch index from the corpus' source files.
+
+    If the task has a checkpoint from a previous run, the sources that were completed
+    are skipped. This assumes that the reader returns sources in a consistent order.
     '''
     reader = make_reader(task.corpus)
 
@@ -20,7 +36,26 @@ def populate(task: PopulateIndexTask):
     files = reader.sources(
         start=task.document_min_date,
         end=task.document_max_date)
-    docs = reader.documents(files)
+
+    if task.sources_completed:
+        logger.info(
+            f'Resuming from checkpoint: skipping {task.sources_completed} sources '
+            f'(last completed: {task.last_source})'
+        )
+    sources_total = len(files) if isinstance(files, Sized) else None
+    progress = SourceCheckpoint(task, sources_total=sources_total)
+    indexed_sources = progress.timed(
+        islice(enumerate(files), task.sources_completed, None)
+    )
+
+    if task.extraction_processes > 1:
+        extracted = extract_sources_parallel(
+            reader, indexed_sources, task.extraction_processes, task.queue_size
+        )
+    else:
+        extracted = extract_sources(reader, indexed_sources)
+
+    docs = progress.documents(extracted)
 
     # Each source document is decorated as an indexing operation, so that it
     # can be sent to ElasticSearch in bulk
@@ -34,20 +69,135 @@ def populate(task: PopulateIndexTask):
         for doc in docs
     )
 
-    server_config = task.index.server.configuration
+    abort_checker = AbortChecker(task)
+    abort_checker.check()
 
-    raise_if_aborted(task)
+    dead_letters = DeadLetterFile(dead_letter_path(f'{task.index.name}-populate-{task.pk}'))
 
     # Do bulk operation
-    client = task.client()
-    for success, info in es_helpers.streaming_bulk(
-        client,
-        actions,
-        chunk_size=server_config["chunk_size"],
-        max_chunk_bytes=server_config["max_chunk_bytes"],
-        raise_on_exception=False,
-        raise_on_error=False,
-    ):
-        if not success:
-            logger.error(f"FAILED INDEX: {info}")
-        raise_if_aborted(task)
+    try:
+        for success, info in send_bulk(task, actions, progress.add_bytes):
+            if not success:
+                log_failure(info)
+                dead_letters.write(info)
+            progress.document_done(success)
+            abort_checker.check()
+        progress.finish()
+    finally:
+        progress.save()
+        dead_letters.close()
+
+    if dead_letters.count:
+        logger.warning(f'{dead_letters.count} documents could not be indexed')
+
+
+def log_failure(info: Dict) -> None:
+    op_type, details = next(iter(info.items()))
+    logger.error(
+        f"FAILED INDEX: {op_type} {details.get('_id')}: status {details.get('status')}, "
+        f"{details.get('error')}"
+    )
+
+
+def bulk_chunk_settings(task: IndexTask) -> Dict:
+    '''
+    Chunk size and maximum chunk size (in bytes) for bulk requests in a task.
+
+    Uses the values set on the task (if it has them), or the configuration of the
+    server as a fallback.
+    '''
+    server_config = task.index.server.configuration
+    chunk_size = getattr(task, 'chunk_size', None)
+    max_chunk_bytes = getattr(task, 'max_chunk_bytes', None)
+    return {
+        'chunk_size': chunk_size or server_config['chunk_size'],
+        'max_chunk_bytes': max_chunk_bytes or server_config['max_chunk_bytes'],
+    }
+
+
+def send_bulk(
+    task: PopulateIndexTask, actions: Iterable[Dict],
+    on_serialized: Optional[Callable[[int], None]] = None,
+):
+    '''
+    Send actions to elasticsearch in bulk requests, using an AdaptiveBulkSender.
+
+    The chunk settings of the task are the starting point for the chunk size. If the
+    task uses more than one bulk thread, chunks are sent in parallel. Yields a
+    `(success, info)` tuple for each action, in the order of the input.
+    `on_serialized` is passed on to the sender.
+    '''
+    sender = AdaptiveBulkSender(
+        task.client(),
+        threads=task.bulk_threads,
+        queue_size=task.queue_size,
+        on_serialized=on_serialized,
+        **bulk_chunk_settings(task),
+    )
+    return sender.send(actions)
+
+
+ExtractedSource = Tuple[int, Any, Iterable[Dict]]
+'An extracted source: a tuple of the index of the source, the source, and its documents'
+
+
+def extract_sources(
+    reader: Reader, indexed_sources: Iterable[Tuple[int, Any]]
+) -> Iterator[ExtractedSource]:
+    '''
+    Extract documents from `(index, source)` tuples.
+
+    Documents are extracted lazily, like in `reader.documents()`.
+    '''
+    for index, source in indexed_sources:
+        yield index, source, reader.source2dicts(source, source_index=index)
+
+
+def _init_extraction_process():
+    '''
+    Initialise a forked extraction process.
+
+    The database connections inherited from the parent cannot be used in the child,
+    so they are discarded; the child opens its own connections if it needs them. They
+    are not closed, since that would also end the session of the parent. References
+    are kept so the connections are not closed by the garbage collector either.
+    '''
+    for conn in connections.all(initialized_only=True):
+        if conn.connection is not None:
+            _inherited_connections.append(conn.connection)
+            conn.connection = None
+
+
+def _extract_source(indexed_source):
+    index, source = indexed_source
+    documents = list(_extraction_reader.source2dicts(source, source_index=index))
+    return index, source, documents
+
+
+def extract_sources_parallel(
+    reader: Reader, indexed_sources: Iterable[Tuple[int, Any]], processes: int,
+    queue_size: int
+) -> Iterator[ExtractedSource]:
+    '''
+    Extract documents from `(index, source)` tuples in a pool of processes.
+
+    Each process extracts all documents from one source at a time. Sources are
+    yielded in the same order as the input. At most `processes + queue_size` sources
+    are extracted ahead of the consumer, so memory use stays bounded if sending the
+    documents is slower than extracting them.
+    '''
+    global _extraction_reader
+    _extraction_reader = reader
+
+    # the pool is forked, so readers do not have to be picklable
+    context = multiprocessing.get_context('fork')
+    max_pending = processes + queue_size
+
+    with context.Pool(processes, initializer=_init_extraction_process) as pool:
+        pending = deque()
+        for indexed_source in indexed_sources:
+            pending.append(pool.apply_async(_extract_source, (indexed_source,)))
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
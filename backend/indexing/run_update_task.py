@@ -1,39 +1,59 @@
+import itertools
+from time import sleep
+from typing import Dict, Iterable, Iterator, Optional
 from django.conf import settings
 
 from addcorpus.python_corpora.corpus import CorpusDefinition
 from es.client import elasticsearch
+from es.download import get_total_hits, make_chunks
+from indexing.bulk import AdaptiveBulkSender, DeadLetterFile, dead_letter_path
 from indexing.models import UpdateIndexTask
+from indexing.progress import QueryProgress, TaskProgress
+from indexing.run_management_tasks import ES_TASK_POLL_INTERVAL
+from indexing.run_populate_task import bulk_chunk_settings, log_failure
 from addcorpus.python_corpora.load_corpus import load_corpus_definition
 from addcorpus.exceptions import PythonDefinitionRequired
+from indexing.stop_job import AbortChecker
 
 import logging
 logger = logging.getLogger('indexing')
 
+UPDATE_BY_QUERY_SLICES = 'auto'
+'Number of slices for update_by_query requests; "auto" uses one slice per shard'
+
+
 def run_update_task(task: UpdateIndexTask) -> None:
     if not task.corpus.has_python_definition:
         raise PythonDefinitionRequired(task.corpus, 'Update task not applicable')
 
     corpus_definition = load_corpus_definition(task.corpus.name)
+    abort_checker = AbortChecker(task)
 
     if corpus_definition.update_body():
-        min_date = task.document_min_date or task.corpus.configuration.min_date
-        max_date = task.document_max_date or task.corpus.configuration.min_date
+        min_date = task.document_min_date or corpus_definition.min_date
+        max_date = task.document_max_date or corpus_definition.max_date
         update_index(
-            task.corpus.name,
+            task,
             corpus_definition,
             corpus_definition.update_query(
                 min_date=min_date.strftime('%Y-%m-%d'),
                 max_date=max_date.strftime('%Y-%m-%d')
-        ))
+            ),
+            abort_checker,
+        )
     elif corpus_definition.update_script():
         update_by_query(
-            task.corpus.name, corpus_definition, corpus_definition.update_script()
+            task, corpus_definition, corpus_definition.update_script(),
+            abort_checker,
         )
     else:
         raise RuntimeError("Cannot update without update_body or update_script")
 
 
-def update_index(corpus: str, corpus_definition: CorpusDefinition, query_model):
+def update_index(
+    task: UpdateIndexTask, corpus_definition: CorpusDefinition, query_model,
+    abort_checker: Optional[AbortChecker] = None,
+):
     ''' update information for fields in the index
     requires the definition of the functions
     - update_query
@@ -41,45 +61,154 @@ def update_index(corpus: str, corpus_definition: CorpusDefinition, query_model):
     - update_body
     (defines which fields should be updated with which value)
     in the corpus definition class
+
+    Documents are scrolled from the index of the task, and updates are sent in bulk
+    requests, like documents in a populate task. Progress is saved on the task.
+
+    If an `abort_checker` is provided, it is checked after each document.
     '''
-    client = elasticsearch(corpus)
-    scroll_timeout, scroll_size = get_es_settings(corpus, corpus_definition)
-    results = client.search(
-        index=corpus,
-        size=scroll_size,
-        scroll=scroll_timeout,
-        body=query_model,
-        timeout=settings.ES_SEARCH_TIMEOUT
+    client = task.client()
+    index = task.index.name
+    scroll_timeout, scroll_size = get_es_settings(task.corpus.name, corpus_definition)
+
+    total = get_total_hits(client, index, query_model)
+    chunks = make_chunks(client, index, scroll_size, scroll_timeout, query_model, total)
+    documents = itertools.chain.from_iterable(chunks)
+
+    # an update task is not resumed from a checkpoint, so progress starts from zero
+    task.documents_completed = 0
+    task.documents_failed = 0
+    progress = TaskProgress(task, documents_total=total)
+    actions = progress.documents(
+        update_actions(index, corpus_definition, documents)
     )
-    hits = len(results['hits']['hits'])
-    total_hits = results['hits']['total']
-    for doc in results['hits']['hits']:
+
+    sender = AdaptiveBulkSender(
+        client, on_serialized=progress.add_bytes, **bulk_chunk_settings(task)
+    )
+    dead_letters = DeadLetterFile(dead_letter_path(f'{index}-update-{task.pk}'))
+
+    try:
+        for success, info in sender.send(actions):
+            if not success:
+                log_failure(info)
+                dead_letters.write(info)
+            progress.document_done(success)
+            if abort_checker:
+                abort_checker.check()
+    finally:
+        progress.save()
+        dead_letters.close()
+
+    if dead_letters.count:
+        logger.warning(f'{dead_letters.count} documents could not be updated')
+
+
+def update_actions(
+    index: str, corpus_definition: CorpusDefinition, documents: Iterable[Dict]
+) -> Iterator[Dict]:
+    '''
+    Convert the output of `corpus_definition.update_body()` for each document into
+    bulk update actions. Documents without an update body are skipped.
+    '''
+    for doc in documents:
         update_body = corpus_definition.update_body(doc)
-        update_document(corpus, doc, update_body, client)
-    while hits<total_hits:
-        scroll_id = results['_scroll_id']
-        for doc in results['hits']['hits']:
-            update_body = corpus_definition.update_body(doc)
-            update_document(corpus, doc, update_body, client)
-        results = client.scroll(scroll_id=scroll_id,
-            scroll=scroll_timeout)
-        hits += len(results['hits']['hits'])
-        logger.info("Updated {} of {} documents".format(hits, total_hits))
-
-
-def update_by_query(corpus: str, corpus_definition: CorpusDefinition, query_generator):
-    client = elasticsearch(corpus)
-    scroll_timeout, scroll_size = get_es_settings(corpus, corpus_definition)
-    for query_model in query_generator:
-        response = client.update_by_query(
-            index=corpus,
-            size=scroll_size,
-            scroll=scroll_timeout,
-            body=query_model,
-            timeout=settings.ES_SEARCH_TIMEOUT
+        if not update_body:
+            continue
+        yield {
+            '_op_type': 'update',
+            '_index': index,
+            '_id': doc['_id'],
+            **update_body,
+        }
+
+
+def update_by_query(
+    task: UpdateIndexTask, corpus_definition: CorpusDefinition, query_generator,
+    abort_checker: Optional[AbortChecker] = None,
+    interval: float = ES_TASK_POLL_INTERVAL,
+):
+    '''
+    Run the update_by_query requests generated by `update_script` in the corpus
+    definition.
+
+    Each request is split into slices (one per shard) and runs as a task in
+    elasticsearch, so it is not affected by request timeouts. Up to
+    `task.concurrent_queries` requests run at the same time. Their status is polled
+    every `interval` seconds and saved as the progress of the task.
+
+    Concurrent requests must update disjoint sets of documents: requests abort on
+    version conflicts, and a request that reports version conflicts or failures
+    raises a `RuntimeError`. If the task is aborted, or one of the requests fails,
+    requests that are still running are cancelled.
+    '''
+    client = task.client()
+    index = task.index.name
+    scroll_timeout, scroll_size = get_es_settings(task.corpus.name, corpus_definition)
+
+    task.documents_completed = 0
+    task.documents_failed = 0
+    progress = QueryProgress(task)
+    queries = iter(query_generator)
+    running: Dict[str, Dict] = {}
+
+    try:
+        while True:
+            while len(running) < task.concurrent_queries:
+                query_model = next(queries, None)
+                if query_model is None:
+                    break
+                if abort_checker:
+                    abort_checker.check()
+                response = client.update_by_query(
+                    index=index,
+                    slices=UPDATE_BY_QUERY_SLICES,
+                    conflicts='abort',
+                    scroll=scroll_timeout,
+                    scroll_size=scroll_size,
+                    wait_for_completion=False,
+                    **query_model
+                )
+                running[response['task']] = query_model
+
+            if not running:
+                break
+
+            sleep(interval)
+            for es_task_id, query_model in list(running.items()):
+                response = client.tasks.get(task_id=es_task_id)
+                progress.update(es_task_id, response)
+                if response['completed']:
+                    del running[es_task_id]
+                    _check_update_by_query_result(response, query_model)
+            if abort_checker:
+                abort_checker.check()
+    except BaseException:
+        for es_task_id in running:
+            logger.warning(f'Cancelling update_by_query task {es_task_id}')
+            client.tasks.cancel(task_id=es_task_id)
+        raise
+    finally:
+        progress.save()
+
+
+def _check_update_by_query_result(response: Dict, query_model: Dict) -> None:
+    if 'error' in response:
+        raise RuntimeError(
+            f'update_by_query failed: {response["error"]} (query: {query_model})'
+        )
+    result = response.get('response', {})
+    failures = result.get('failures', [])
+    for failure in failures:
+        logger.error(f'FAILED UPDATE: {failure}')
+    conflicts = result.get('version_conflicts', 0)
+    if failures or conflicts:
+        raise RuntimeError(
+            f'update_by_query completed with {len(failures)} failures and '
+            f'{conflicts} version conflicts (query: {query_model})'
         )
-        if response['updated']==0:
-            logger.info('No documents updated for query {}'.format(query_model))
+    if result.get('updated', 0) == 0:
+        logger.info('No documents updated for query {}'.format(query_model))
 
 
 def update_document(corpus: str, doc, update_body, client=None):
@@ -1,5 +1,10 @@
+from time import monotonic
+
 from indexing.models import IndexJob, TaskStatus, IndexTask
 
+ABORT_CHECK_INTERVAL = 5
+'Minimum time (in seconds) between status checks by an AbortChecker'
+
 
 def is_stoppable(job: IndexJob):
     return job.status() in [TaskStatus.QUEUED, TaskStatus.WORKING]
@@ -27,6 +32,30 @@ def raise_if_aborted(task: IndexTask):
     `run_task` wrapper will check the task status at the start; adding checks
     is useful for long-running tasks.
     '''
-    task.refresh_from_db()
     if task.is_aborted():
         raise TaskAborted
+
+
+class AbortChecker:
+    '''
+    Checks whether a task is aborted, at most once per `interval` seconds.
+
+    `raise_if_aborted` queries the database, so calling it for every document in a
+    long-running task adds a lot of overhead. Task handlers can instead create an
+    AbortChecker and call `check()` as often as they like.
+    '''
+
+    def __init__(self, task: IndexTask, interval: float = ABORT_CHECK_INTERVAL):
+        self.task = task
+        self.interval = interval
+        self.last_check = None
+
+    def check(self) -> None:
+        '''
+        Raise an exception if the task is aborted. Only queries the task status if
+        the last check was at least `interval` seconds ago.
+        '''
+        now = monotonic()
+        if self.last_check is None or now - self.last_check >= self.interval:
+            self.last_check = now
+            raise_if_aborted(self.task)
@@ -0,0 +1,100 @@
+import json
+from elasticsearch import Elasticsearch
+
+from indexing.bulk import AdaptiveBulkSender, DeadLetterFile, read_dead_letters
+
+
+class MockBulkClient:
+    '''
+    Mock client for bulk requests. Rejects documents with status 429 in the first
+    `rejections` requests, and fails documents with the ID "bad".
+    '''
+
+    def __init__(self, rejections=0):
+        self.transport = Elasticsearch('http://localhost:9200').transport
+        self.rejections = rejections
+        self.requests = []
+
+    def bulk(self, operations):
+        headers = [json.loads(line) for line in operations[::2]]
+        self.requests.append(len(headers))
+        reject = self.rejections > 0
+        self.rejections -= 1
+
+        items = []
+        for i, header in enumerate(headers):
+            op_type, metadata = header.popitem()
+            if reject and i == 0:
+                status = 429
+            elif metadata['_id'] == 'bad':
+                status = 400
+            else:
+                status = 201
+            items.append({op_type: {**metadata, 'status': status}})
+        return {'items': items}
+
+
+def make_actions(ids):
+    return [
+        {'_op_type': 'index', '_index': 'test', '_id': id, '_source': {'content': id}}
+        for id in ids
+    ]
+
+
+def test_adaptive_bulk_sender():
+    ids = [str(i) for i in range(25)]
+    ids[12] = 'bad'
+    client = MockBulkClient(rejections=1)
+    sender = AdaptiveBulkSender(
+        client, chunk_size=10, max_chunk_bytes=10000, min_chunk_size=1,
+        initial_backoff=0,
+    )
+
+    results = list(sender.send(make_actions(ids)))
+
+    assert [info['index']['_id'] for _, info in results] == ids
+    assert [success for success, _ in results] == [id != 'bad' for id in ids]
+    assert results[12][1]['index']['data'] == {'content': 'bad'}
+
+    # first chunk: 10 documents, then the rejected document is retried
+    assert client.requests[:2] == [10, 1]
+    assert sum(client.requests) == 26
+
+
+def test_adaptive_bulk_sender_serialized_size():
+    client = MockBulkClient()
+    sizes = []
+    sender = AdaptiveBulkSender(
+        client, chunk_size=10, max_chunk_bytes=10000, on_serialized=sizes.append,
+    )
+    actions = make_actions([str(i) for i in range(5)])
+    list(sender.send(actions))
+
+    expected = [
+        len(json.dumps({'index': {'_index': 'test', '_id': action['_id']}}, separators=(',', ':')))
+        + len(json.dumps(action['_source'], separators=(',', ':'))) + 2
+        for action in actions
+    ]
+    assert sizes == expected
+
+
+def test_adaptive_bulk_sender_max_bytes():
+    client = MockBulkClient()
+    sender = AdaptiveBulkSender(client, chunk_size=100, max_chunk_bytes=500)
+    results = list(sender.send(make_actions([str(i) for i in range(20)])))
+    assert len(results) == 20
+    assert len(client.requests) > 1
+
+
+def test_dead_letters(tmp_path):
+    path = str(tmp_path / 'failed.jsonl')
+    client = MockBulkClient()
+    sender = AdaptiveBulkSender(client, chunk_size=10, max_chunk_bytes=10000)
+
+    with DeadLetterFile(path) as dead_letters:
+        for success, info in sender.send(make_actions(['1', 'bad', '2'])):
+            if not success:
+                dead_letters.write(info)
+
+    assert dead_letters.count == 1
+    assert list(read_dead_letters(path)) == make_actions(['bad'])
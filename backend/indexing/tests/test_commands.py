@@ -1,4 +1,4 @@
-from django.core.management import call_command
+from django.core.management import call_command, CommandError
 import pytest
 from elastic_transport import ConnectionError
 
@@ -24,3 +24,9 @@ def test_create_only(db, basic_mock_corpus, no_elasticsearch_connection):
     call_command('index', basic_mock_corpus, '--create-only')
     assert IndexJob.objects.get(corpus__name=basic_mock_corpus)
 
+
+
+def test_resume_without_job(db, basic_mock_corpus):
+    IndexJob.objects.filter(corpus__name=basic_mock_corpus).delete()
+    with pytest.raises(CommandError):
+        call_command('index', basic_mock_corpus, '--resume')
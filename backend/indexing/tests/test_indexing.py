@@ -1,11 +1,15 @@
 import pytest
 from datetime import datetime
 from time import sleep
+from unittest import mock
 
 from addcorpus.models import Corpus
 from indexing.models import TaskStatus
 from indexing.run_job import perform_indexing
 from indexing.create_job import create_indexing_job
+from indexing.run_create_task import RESET_BULK_LOAD_SETTINGS
+from indexing.run_management_tasks import force_merge, wait_for_es_task
+from indexing.run_update_task import update_index, update_by_query
 
 START = datetime.strptime('1970-01-01', '%Y-%m-%d')
 END = datetime.strptime('1970-12-31', '%Y-%m-%d')
@@ -133,3 +137,131 @@ def test_task_status_invalid(json_mock_corpus, es_index_client):
     perform_indexing(job)
 
     assert job.status() == TaskStatus.CANCELLED
+
+
+def test_bulk_load(mock_corpus, es_index_client):
+    corpus = Corpus.objects.get(name=mock_corpus)
+    job = create_indexing_job(corpus, START, END, bulk_load=True, force_merge=True)
+    assert job.createindextasks.get().bulk_load_settings
+    assert job.forcemergetasks.count() == 1
+    assert job.updatesettingstasks.get().settings == RESET_BULK_LOAD_SETTINGS
+
+    perform_indexing(job)
+    assert job.status() == TaskStatus.DONE
+
+    index_settings = es_index_client.indices.get_settings(index='test-times')
+    assert 'refresh_interval' not in index_settings['test-times']['settings']['index']
+    sleep(1)
+    res = es_index_client.count(index='test-times')
+    assert res.get('count') == 2
+
+
+class UpdateDefinition:
+    '''Minimal corpus definition with an update body'''
+
+    def update_body(self, doc=None):
+        if not doc:
+            return True
+        return {'doc': {'title': doc['_id'].upper()}}
+
+
+def test_update_index(mock_corpus, es_index_client):
+    corpus = Corpus.objects.get(name=mock_corpus)
+    job = create_indexing_job(corpus, START, END)
+    perform_indexing(job)
+    sleep(1)
+
+    update_job = create_indexing_job(corpus, START, END, update=True)
+    task = update_job.updateindextasks.get()
+    update_index(task, UpdateDefinition(), {'query': {'match_all': {}}})
+
+    task.refresh_from_db()
+    assert task.documents_completed == 2
+    assert task.documents_failed == 0
+
+    es_index_client.indices.refresh(index='test-times')
+    hits = es_index_client.search(index='test-times')['hits']['hits']
+    assert all(hit['_source']['title'] == hit['_id'].upper() for hit in hits)
+
+
+def test_update_by_query(mock_corpus, es_index_client):
+    corpus = Corpus.objects.get(name=mock_corpus)
+    job = create_indexing_job(corpus, START, END)
+    perform_indexing(job)
+    sleep(1)
+
+    update_job = create_indexing_job(
+        corpus, START, END, update=True, concurrent_queries=2
+    )
+    task = update_job.updateindextasks.get()
+    ids = [
+        hit['_id'] for hit in es_index_client.search(index='test-times')['hits']['hits']
+    ]
+    queries = (
+        {
+            'script': {'source': "ctx._source.title = 'updated'", 'lang': 'painless'},
+            'query': {'ids': {'values': [doc_id]}},
+        }
+        for doc_id in ids
+    )
+    update_by_query(task, None, queries, interval=0.1)
+
+    task.refresh_from_db()
+    assert task.documents_completed == len(ids)
+    assert task.documents_failed == 0
+
+    es_index_client.indices.refresh(index='test-times')
+    hits = es_index_client.search(index='test-times')['hits']['hits']
+    assert all(hit['_source']['title'] == 'updated' for hit in hits)
+
+
+@pytest.mark.parametrize('status', [
+    {'completed': True, 'error': {'type': 'task_cancelled_exception'}},
+    {'completed': True, 'response': {'failures': [{'cause': {'type': 'exception'}}]}},
+])
+def test_wait_for_es_task_failure(status):
+    client = mock.Mock()
+    client.tasks.get.return_value = status
+    with pytest.raises(RuntimeError):
+        wait_for_es_task(client, 'node:1', interval=0)
+
+
+@pytest.mark.parametrize('concurrent_queries', [1, 2])
+def test_update_by_query_conflicts(db, mock_corpus, concurrent_queries):
+    corpus = Corpus.objects.get(name=mock_corpus)
+    job = create_indexing_job(
+        corpus, START, END, update=True, concurrent_queries=concurrent_queries
+    )
+    task = job.updateindextasks.get()
+    status = {
+        'updated': 1, 'deleted': 0, 'noops': 0, 'version_conflicts': 1,
+    }
+    client = mock.Mock()
+    client.update_by_query.return_value = {'task': 'node:1'}
+    client.tasks.get.return_value = {
+        'completed': True,
+        'task': {'status': status},
+        'response': {**status, 'failures': []},
+    }
+    queries = [{'query': {'match_all': {}}}]
+
+    with mock.patch.object(type(task), 'client', return_value=client):
+        with pytest.raises(RuntimeError):
+            update_by_query(task, None, queries, interval=0)
+
+    assert client.update_by_query.call_args.kwargs['conflicts'] == 'abort'
+
+
+def test_force_merge_refreshes_first():
+    client = mock.Mock()
+    client.indices.forcemerge.return_value = {'task': 'node:1'}
+    client.tasks.get.return_value = {'completed': True, 'response': {}}
+    task = mock.Mock(max_num_segments=1)
+    task.index.name = 'test-times'
+    task.client.return_value = client
+
+    with mock.patch('indexing.run_management_tasks.AbortChecker'):
+        force_merge(task)
+
+    calls = [name for name, _, _ in client.indices.method_calls]
+    assert calls == ['refresh', 'forcemerge']
@@ -0,0 +1,145 @@
+from datetime import datetime
+from django.db import connection
+
+from addcorpus.models import Corpus
+from indexing.create_job import create_indexing_job
+from indexing.models import TaskStatus
+from indexing.progress import SourceCheckpoint
+from indexing.run_job import is_resumable, mark_tasks_resumed
+from indexing.run_populate_task import extract_sources, extract_sources_parallel
+
+START = datetime.strptime('1970-01-01', '%Y-%m-%d')
+END = datetime.strptime('1970-12-31', '%Y-%m-%d')
+
+
+def test_extract_sources_parallel(corpus_definition):
+    sources = list(corpus_definition.sources(start=START, end=END))
+    expected = [
+        (index, source, list(documents))
+        for index, source, documents in extract_sources(corpus_definition, enumerate(sources))
+    ]
+
+    result = extract_sources_parallel(
+        corpus_definition, enumerate(sources), processes=2, queue_size=1
+    )
+    assert list(result) == expected
+
+
+def test_extract_sources_parallel_keeps_connection(db, corpus_definition):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+    sources = list(corpus_definition.sources(start=START, end=END))
+    list(extract_sources_parallel(
+        corpus_definition, enumerate(sources), processes=2, queue_size=1
+    ))
+
+    # the connection of the parent process is still usable
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        assert cursor.fetchone() == (1,)
+
+
+def test_source_checkpoint(db, mock_corpus):
+    corpus = Corpus.objects.get(name=mock_corpus)
+    job = create_indexing_job(corpus)
+    task = job.populateindextasks.first()
+
+    checkpoint = SourceCheckpoint(task, interval=0)
+    extracted = [
+        (0, ('a.xml', {}), [{'id': 1}, {'id': 2}]),
+        (1, ('b.xml', {}), []),
+        (2, ('c.xml', {}), [{'id': 3}]),
+    ]
+    documents = checkpoint.documents(extracted)
+
+    for _ in range(2):
+        next(documents)
+        checkpoint.document_done()
+    task.refresh_from_db()
+    assert task.documents_completed == 2
+    assert task.sources_completed == 0
+
+    next(documents)
+    checkpoint.document_done()
+    task.refresh_from_db()
+    assert task.sources_completed == 2
+    assert task.last_source == 'b.xml'
+
+    assert next(documents, None) is None
+    checkpoint.finish()
+    checkpoint.save()
+    task.refresh_from_db()
+    assert task.sources_completed == 3
+    assert task.documents_completed == 3
+
+
+def test_source_checkpoint_failure(db, mock_corpus):
+    corpus = Corpus.objects.get(name=mock_corpus)
+    job = create_indexing_job(corpus)
+    task = job.populateindextasks.first()
+
+    checkpoint = SourceCheckpoint(task, interval=0)
+    extracted = [
+        (0, ('a.xml', {}), [{'id': 1}]),
+        (1, ('b.xml', {}), [{'id': 2}]),
+        (2, ('c.xml', {}), [{'id': 3}]),
+    ]
+    documents = checkpoint.documents(extracted)
+
+    for success in [True, False, True]:
+        next(documents)
+        checkpoint.document_done(success)
+    assert next(documents, None) is None
+    checkpoint.finish()
+    checkpoint.save()
+    task.refresh_from_db()
+
+    # b.xml had a failed document, so a resumed task starts from there
+    assert task.documents_completed == 3
+    assert task.documents_failed == 1
+    assert task.sources_completed == 1
+    assert task.last_source == 'a.xml'
+
+
+def test_resume_job(db, mock_corpus):
+    corpus = Corpus.objects.get(name=mock_corpus)
+    job = create_indexing_job(corpus)
+    assert not is_resumable(job)
+
+    job.createindextasks.update(status=TaskStatus.DONE)
+    job.populateindextasks.update(status=TaskStatus.ERROR)
+    assert is_resumable(job)
+
+    mark_tasks_resumed(job)
+    assert job.createindextasks.get().status == TaskStatus.DONE
+    assert job.populateindextasks.get().status == TaskStatus.CREATED
+    assert not is_resumable(job)
+
+
+def test_task_progress(db, mock_corpus):
+    corpus = Corpus.objects.get(name=mock_corpus)
+    job = create_indexing_job(corpus)
+    task = job.populateindextasks.first()
+
+    progress = SourceCheckpoint(task, interval=0, sources_total=4)
+    extracted = [
+        (0, 'a.xml', [{'id': 1}, {'id': 2}]),
+        (1, 'b.xml', [{'id': 3}]),
+        (2, 'c.xml', [{'id': 4}]),
+    ]
+    documents = progress.documents(progress.timed(extracted))
+
+    for document in documents:
+        progress.add_bytes(100)
+        progress.document_done(success=document['id'] != 2)
+
+    task.refresh_from_db()
+    assert task.documents_completed == 4
+    assert task.documents_failed == 1
+    assert task.current_source == 'c.xml'
+    assert task.documents_per_second > 0
+    assert task.bytes_per_second > 0
+    assert set(task.timings.keys()) == {'read', 'extract', 'send'}
+    assert task.estimated_completion
+    assert task.progress_updated
@@ -1,3 +1,4 @@
+import pytest
 from time import sleep
 from copy import copy
 from elasticsearch import Elasticsearch
@@ -49,3 +50,21 @@ def test_stop_job(transactional_db, mock_corpus, es_index_client: Elasticsearch,
     result = search.search(mock_corpus, MATCH_ALL, es_index_client)
     assert 0 < search.total_hits(result) < 20
 
+
+
+def test_abort_checker(db, mock_corpus, django_assert_num_queries):
+    corpus = Corpus.objects.get(name=mock_corpus)
+    job = create_job.create_indexing_job(corpus)
+    task = job.populateindextasks.first()
+    checker = stop_job.AbortChecker(task, interval=60)
+
+    with django_assert_num_queries(1):
+        checker.check()
+        checker.check()
+
+    stop_job.mark_tasks_stopped(job)
+    checker.check() # not checked within the interval
+
+    checker.last_check -= 60
+    with pytest.raises(stop_job.TaskAborted):
+        checker.check()
@@ -4,6 +4,7 @@ import random
 
 from corpora_test.small.small_mock_corpus import SPECS as SMALL_MOCK_CORPUS_SPECS
 from corpora_test.large.large_mock_corpus import SPECS as LARGE_MOCK_CORPUS_SPECS
+from visualization.termvectors import clear_query_matcher_cache
 
 here = os.path.abspath(os.path.dirname(__file__))
 
@@ -50,6 +51,13 @@ class MockClient(object):
                 }
             } for field in fields}}
 
+@pytest.fixture(autouse=True)
+def auto_clear_query_matcher_cache():
+    '''Clear cached query analysis, since tests may use different clients for the same index.'''
+    clear_query_matcher_cache()
+    yield
+    clear_query_matcher_cache()
+
 @pytest.fixture()
 def es_client_m_hits():
     ''' return a client that is expected to give:
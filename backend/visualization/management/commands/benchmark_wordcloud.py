@@ -0,0 +1,89 @@
+import json
+from time import perf_counter
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from es import download as es_download
+from visualization import query, wordcloud
+
+
+class Command(BaseCommand):
+    help = '''
+    Compare the methods to compute wordcloud data for a corpus: counting words in the
+    source text of documents with a CountVectorizer, or counting terms from term
+    vectors.
+
+    Reports the time and the size of the data that was fetched from Elasticsearch for
+    each method, and how many of the top words they share.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'corpus',
+            help='name of the corpus',
+        )
+        parser.add_argument(
+            'field',
+            help='name of the field to use in the wordcloud',
+        )
+        parser.add_argument(
+            '--query', '-q',
+            help='query text (optional); if left out, all documents are matched',
+        )
+        parser.add_argument(
+            '--size', '-s',
+            type=int,
+            default=settings.WORDCLOUD_LIMIT,
+            help='number of documents to include (default: WORDCLOUD_LIMIT setting)',
+        )
+
+    def handle(self, corpus, field, query=None, size=None, **options):
+        if not wordcloud.termvectors_field(corpus, field):
+            raise CommandError(f'Field {field} has no term vectors')
+
+        es_query = self._make_query(query)
+
+        documents_result, documents_time, documents_bytes = self._run(
+            lambda chunks: wordcloud.make_wordcloud_data(
+                (document for chunk in chunks for document in chunk), field, corpus
+            ),
+            corpus, es_query, size, source_includes=es_download.source_includes([field]),
+        )
+        termvectors_result, termvectors_time, termvectors_bytes = self._run(
+            lambda chunks: wordcloud.make_wordcloud_data_from_termvectors(chunks, field, corpus),
+            corpus, es_query, size, source=False,
+        )
+
+        self.stdout.write(
+            f'documents:    {documents_time:.2f}s, {documents_bytes} bytes of hits'
+        )
+        self.stdout.write(
+            f'term vectors: {termvectors_time:.2f}s, {termvectors_bytes} bytes of hits '
+            '(excluding term vectors)'
+        )
+
+        documents_words = set(item['key'] for item in documents_result)
+        termvectors_words = set(item['key'] for item in termvectors_result)
+        shared = documents_words.intersection(termvectors_words)
+        self.stdout.write(
+            f'{len(shared)} of {len(documents_words)} words are included in both results'
+        )
+
+    def _make_query(self, query_text):
+        if query_text:
+            return query.set_query_text(query.MATCH_ALL, query_text)
+        return query.MATCH_ALL
+
+    def _run(self, make_data, corpus, es_query, size, **kwargs):
+        n_bytes = 0
+
+        def measured(chunks):
+            nonlocal n_bytes
+            for chunk in chunks:
+                n_bytes += len(json.dumps(chunk))
+                yield chunk
+
+        start = perf_counter()
+        chunks, _ = es_download.scroll_chunks(corpus, es_query, size, **kwargs)
+        result = make_data(measured(chunks))
+        return result, perf_counter() - start, n_bytes
@@ -1,10 +1,10 @@
 from collections import Counter
 from typing import Tuple
 
-from addcorpus.models import CorpusConfiguration
+from addcorpus.metadata import corpus_metadata
 from datetime import datetime
 from es.search import get_index
-from es.download import scroll
+from es.download import scroll_chunks
 from es.client import elasticsearch
 from visualization import query, termvectors
 
@@ -37,7 +37,7 @@ def get_total_time_interval(es_query, corpus) -> Tuple[datetime, datetime]:
     if query_min and query_max:
         return query_min, query_max
 
-    corpus_conf = CorpusConfiguration.objects.get(corpus__name=corpus)
+    corpus_conf = corpus_metadata(corpus)
     corpus_min = datetime(corpus_conf.min_year, month=1, day=1)
     corpus_max = datetime(corpus_conf.max_year, month=12, day=31)
 
@@ -100,22 +100,24 @@ def tokens_by_time_interval(corpus_name, es_query, field, bin, ngram_size, term_
     date_filter = query.make_date_filter(start_date, end_date, date_field)
     narrow_query = query.add_filter(es_query, date_filter)
     #search for the query text
-    search_results, _total = scroll(
+    hit_chunks, _total = scroll_chunks(
         corpus=corpus_name,
         query_model=narrow_query,
         client=client,
         download_size=max_size_per_interval,
+        source=False,
     )
     bin_ngrams = Counter()
-    for hit in search_results:
-        identifier = hit['_id']
-        # get the term vectors for the hit
-        result = client.termvectors(
-            index=index,
-            id=identifier,
-            term_statistics=freq_compensation,
-            fields=[field]
-        )
+    # get the term vectors for the hits, one batch at a time
+    termvector_results = termvectors.batched_termvectors(
+        client,
+        index,
+        hit_chunks,
+        fields=[field],
+        batch_size=termvectors.termvectors_batch_size(corpus_name),
+        term_statistics=freq_compensation,
+    )
+    for result in termvector_results:
         terms = termvectors.get_terms(result, field)
         if terms:
             sorted_tokens = termvectors.get_tokens(terms, sort=True)
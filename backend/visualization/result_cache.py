@@ -0,0 +1,177 @@
+'''
+Cache for the results of visualisations.
+
+Results are stored in the `'visualization'` cache (see the `CACHES` setting). If that
+cache is not configured, results are not cached.
+
+Keys are a hash of the corpus, the current index of the corpus, the elasticsearch
+query (including tag filters) and the parameters of the visualisation. Because the
+name of the current index is part of the key, cached results are no longer used when
+the alias of a corpus is moved to a new index.
+'''
+
+import hashlib
+import json
+import logging
+from typing import Dict, List, Optional
+from django.conf import settings
+from django.core.cache import caches
+from celery import current_app as celery_app, states
+from celery.utils import uuid
+
+from addcorpus.metadata import corpus_metadata
+from api.api_query import api_query_to_es_query
+from es.client import elasticsearch
+
+VISUALIZATION_CACHE = 'visualization'
+
+NGRAM_PARAMETERS = [
+    'field', 'ngram_size', 'term_position', 'freq_compensation', 'subfield',
+    'max_size_per_interval', 'number_of_ngrams', 'date_field',
+]
+
+logger = logging.getLogger(__name__)
+
+
+def _get_cache():
+    if VISUALIZATION_CACHE in settings.CACHES:
+        return caches[VISUALIZATION_CACHE]
+
+
+def current_index(corpus_name: str) -> str:
+    '''
+    Name of the index that the alias of a corpus points to. Resolve this once per
+    request, and pass it to `make_key` for each key.
+    '''
+    client = elasticsearch(corpus_name)
+    metadata = corpus_metadata(corpus_name)
+    alias = metadata.es_alias or metadata.es_index
+    # get_alias only returns alias metadata, which is much smaller than the full
+    # index metadata
+    indices = client.indices.get_alias(index=alias)
+    return max(sorted(indices.keys()))
+
+
+def make_key(corpus_name: str, index: str, es_query: Dict, **parameters) -> Optional[str]:
+    '''
+    Make a cache key for a visualisation.
+
+    Parameters:
+    - `corpus_name`: the name of the corpus
+    - `index`: the current index of the corpus (see `current_index`)
+    - `es_query`: the elasticsearch query, including any tag filters
+    - kwargs: parameters of the visualisation. These should be JSON-serialisable.
+
+    Returns `None` if no cache is configured.
+    '''
+    if not _get_cache():
+        return None
+
+    data = {
+        'corpus': corpus_name,
+        'index': index,
+        'query': es_query,
+        'parameters': parameters,
+    }
+    serialised = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return 'visualization:' + hashlib.sha256(serialised.encode()).hexdigest()
+
+
+def wordcloud_key(request_json: Dict) -> Optional[str]:
+    if not _get_cache():
+        return None
+    corpus_name = request_json['corpus']
+    es_query = api_query_to_es_query(request_json, corpus_name)
+    return make_key(
+        corpus_name, current_index(corpus_name), es_query,
+        visualization='wordcloud',
+        field=request_json['field'],
+        size=settings.WORDCLOUD_LIMIT,
+    )
+
+
+def ngram_key(request_json: Dict) -> Optional[str]:
+    if not _get_cache():
+        return None
+    corpus_name = request_json['corpus_name']
+    es_query = api_query_to_es_query(request_json, corpus_name)
+    parameters = {key: request_json[key] for key in NGRAM_PARAMETERS}
+    return make_key(
+        corpus_name, current_index(corpus_name), es_query, visualization='ngram',
+        **parameters
+    )
+
+
+def term_frequency_bin_keys(request_json: Dict, visualization: str) -> Optional[List[str]]:
+    '''
+    Cache keys for each bin in a timeline or histogram term frequency series.
+
+    The current index is only requested once for all keys.
+    '''
+    if not _get_cache():
+        return None
+    corpus_name = request_json['corpus_name']
+    es_query = api_query_to_es_query(request_json, corpus_name)
+    index = current_index(corpus_name)
+    series_key = make_key(
+        corpus_name, index, es_query,
+        visualization=visualization,
+        field_name=request_json['field_name'],
+    )
+    return [
+        make_key(corpus_name, index, es_query, series=series_key, bin=bin)
+        for bin in request_json['bins']
+    ]
+
+
+def get_cached_result(key: Optional[str]):
+    '''
+    Get a cached result. Returns `None` if the result is not in the cache.
+    '''
+    cache = _get_cache()
+    if not cache or not key:
+        return None
+    try:
+        return cache.get(key)
+    except Exception as e:
+        logger.warning(f'Could not read visualization cache: {e}')
+
+
+def get_cached_results(keys: Optional[List[str]]) -> Optional[List]:
+    '''
+    Get cached results for a list of keys. Returns `None` unless all results are
+    in the cache.
+    '''
+    cache = _get_cache()
+    if not cache or not keys:
+        return None
+    try:
+        results = cache.get_many(keys)
+    except Exception as e:
+        logger.warning(f'Could not read visualization cache: {e}')
+        return None
+    if all(key in results for key in keys):
+        return [results[key] for key in keys]
+
+
+def cache_result(key: Optional[str], result) -> None:
+    cache = _get_cache()
+    if not cache or not key:
+        return
+    try:
+        cache.set(key, result)
+    except Exception as e:
+        logger.warning(f'Could not write to visualization cache: {e}')
+
+
+def completed_task_id(result) -> str:
+    '''
+    Store a result in the celery result backend as a completed task, without running
+    anything on a worker.
+
+    Returns the task ID, which can be used like the ID of a scheduled task, i.e. its
+    status and result can be requested through the task status API.
+    '''
+    task_id = uuid()
+    celery_app.backend.store_result(task_id, result, states.SUCCESS)
+    return task_id
@@ -1,6 +1,6 @@
 from celery import chord, group, shared_task
 from django.conf import settings
-from visualization import wordcloud, ngram, term_frequency
+from visualization import wordcloud, ngram, term_frequency, query, result_cache
 from es import download as es_download, search as es_search
 from api.api_query import api_query_to_es_query
 
@@ -8,8 +8,16 @@ from api.api_query import api_query_to_es_query
 def get_wordcloud_data(request_json):
     corpus_name = request_json['corpus']
     es_query = api_query_to_es_query(request_json, corpus_name)
-    list_of_texts, _ = es_download.scroll(corpus_name, es_query, settings.WORDCLOUD_LIMIT)
-    word_counts = wordcloud.make_wordcloud_data(list_of_texts, request_json['field'], request_json['corpus'])
+    field = request_json['field']
+    if wordcloud.use_termvectors(corpus_name, field):
+        chunks, _ = es_download.scroll_chunks(corpus_name, es_query, settings.WORDCLOUD_LIMIT, source=False)
+        word_counts = wordcloud.make_wordcloud_data_from_termvectors(chunks, field, corpus_name)
+    else:
+        chunks, _ = es_download.scroll_chunks(
+            corpus_name, es_query, settings.WORDCLOUD_LIMIT,
+            source_includes=es_download.source_includes([field]),
+        )
+        word_counts = wordcloud.make_wordcloud_data_from_chunks(chunks, field, corpus_name)
     return word_counts
 
 
@@ -65,10 +73,12 @@ def get_ngram_data_bin(**kwargs):
     return ngram.tokens_by_time_interval(**kwargs)
 
 @shared_task
-def integrate_ngram_results(results, **kwargs):
-    return ngram.get_ngrams(results, **kwargs)
+def integrate_ngram_results(results, cache_key=None, **kwargs):
+    output = ngram.get_ngrams(results, **kwargs)
+    result_cache.cache_result(cache_key, output)
+    return output
 
-def ngram_data_tasks(request_json):
+def ngram_data_tasks(request_json, cache_key=None):
     corpus_name = request_json['corpus_name']
     es_query = api_query_to_es_query(request_json, corpus_name)
     freq_compensation = request_json['freq_compensation']
@@ -89,72 +99,99 @@ def ngram_data_tasks(request_json):
         )
         for b in bins
     ]), integrate_ngram_results.s(
-            number_of_ngrams=request_json['number_of_ngrams']
+            number_of_ngrams=request_json['number_of_ngrams'],
+            cache_key=cache_key,
         )
     )
 
 @shared_task()
-def get_histogram_term_frequency_bin(es_query, corpus_name, field_name, field_value, size, include_query_in_result = False):
+def get_histogram_term_frequency_bin(es_query, corpus_name, field_name, field_value, size, include_query_in_result = False, totals = None, cache_key = None):
     '''
     Calculate the value for a single series + bin in the histogram term frequency
     graph.
     '''
-    return term_frequency.get_aggregate_term_frequency(
+    result = term_frequency.get_aggregate_term_frequency(
         es_query, corpus_name, field_name, field_value, size,
-        include_query_in_result = include_query_in_result
+        include_query_in_result = include_query_in_result,
+        totals = totals,
     )
+    result_cache.cache_result(cache_key, result)
+    return result
 
-def histogram_term_frequency_tasks(request_json, include_query_in_result = False):
+def histogram_term_frequency_tasks(request_json, include_query_in_result = False, cache_keys = None):
     '''
     Calculate values for an entire series in the histogram term frequency graph.
-    Schedules one task for each bin, which can be run in parallel.
+    Document and token counts for all bins are computed in a single search; the
+    match counts are computed in one task for each bin, which can be run in parallel.
     '''
     corpus_name = request_json['corpus_name']
     es_query = api_query_to_es_query(request_json, corpus_name)
+    field_name = request_json['field_name']
     bins = request_json['bins']
 
+    bin_filters = [
+        query.make_term_filter(field_name, bin['field_value'])
+        for bin in bins
+    ]
+    totals = term_frequency.get_total_docs_and_tokens_by_bin(es_query, corpus_name, bin_filters)
+
     return group([
         get_histogram_term_frequency_bin.s(
             es_query,
             corpus_name,
-            request_json['field_name'],
+            field_name,
             bin['field_value'],
             bin['size'],
-            include_query_in_result = include_query_in_result
+            include_query_in_result = include_query_in_result,
+            totals = bin_totals,
+            cache_key = cache_keys[i] if cache_keys else None,
         )
-        for bin in bins
+        for i, (bin, bin_totals) in enumerate(zip(bins, totals))
     ])
 
 @shared_task()
-def get_timeline_term_frequency_bin(es_query, corpus_name, field_name, start_date, end_date, size, include_query_in_result = False):
+def get_timeline_term_frequency_bin(es_query, corpus_name, field_name, start_date, end_date, size, include_query_in_result = False, totals = None, cache_key = None):
     '''
     Calculate the value for a single series + bin in the timeline term frequency
     graph.
     '''
-    return term_frequency.get_date_term_frequency(
+    result = term_frequency.get_date_term_frequency(
         es_query, corpus_name, field_name, start_date, end_date, size,
-        include_query_in_result = include_query_in_result
+        include_query_in_result = include_query_in_result,
+        totals = totals,
     )
+    result_cache.cache_result(cache_key, result)
+    return result
 
-def timeline_term_frequency_tasks(request_json, include_query_in_result = False):
+def timeline_term_frequency_tasks(request_json, include_query_in_result = False, cache_keys = None):
     '''
     Calculate values for an entire series in the timeline term frequency graph.
-    Schedules one task for each bin, which can be run in parallel.
+    Document and token counts for all bins are computed in a single search; the
+    match counts are computed in one task for each bin, which can be run in parallel.
     '''
 
     corpus_name = request_json['corpus_name']
     es_query = api_query_to_es_query(request_json, corpus_name)
+    field_name = request_json['field_name']
     bins = request_json['bins']
 
+    bin_filters = [
+        term_frequency.make_date_bin_filter(field_name, bin['start_date'], bin['end_date'])
+        for bin in bins
+    ]
+    totals = term_frequency.get_total_docs_and_tokens_by_bin(es_query, corpus_name, bin_filters)
+
     return group(
         get_timeline_term_frequency_bin.s(
             es_query,
             corpus_name,
-            request_json['field_name'],
+            field_name,
             bin['start_date'],
             bin['end_date'],
             bin['size'],
-            include_query_in_result = include_query_in_result
+            include_query_in_result = include_query_in_result,
+            totals = bin_totals,
+            cache_key = cache_keys[i] if cache_keys else None,
         )
-        for bin in bins
+        for i, (bin, bin_totals) in enumerate(zip(bins, totals))
     )
@@ -1,8 +1,10 @@
 import math
-from addcorpus.models import CorpusConfiguration
+import logging
+from elasticsearch import BadRequestError
+from addcorpus.metadata import corpus_metadata
 from datetime import datetime
-from es.search import get_index, total_hits, search
-from es.client import elasticsearch
+from es.search import get_index, total_hits, search, aggregation_results
+from es.client import elasticsearch, server_for_corpus
 from copy import deepcopy
 from visualization import query, termvectors
 from es import download
@@ -10,19 +12,28 @@ from es import download
 DEFAULT_SIZE = 100
 ESTIMATE_WINDOW = 5
 
+# sums the frequencies of the query terms in a document; requires Elasticsearch 8.16+
+MATCH_COUNT_SCRIPT = '_termStats.termFreq().getSum()'
+
+logger = logging.getLogger(__name__)
+
+# servers on which MATCH_COUNT_SCRIPT cannot be used
+_servers_without_term_stats = set()
+
 def parse_datestring(datestring):
     return datetime.strptime(datestring, '%Y-%m-%d')
 
-def get_date_term_frequency(es_query, corpus, field, start_date_str, end_date_str=None, size=DEFAULT_SIZE, include_query_in_result=False):
-
+def make_date_bin_filter(field, start_date_str, end_date_str=None):
     start_date = parse_datestring(start_date_str)
     end_date = parse_datestring(end_date_str) if end_date_str else None
+    return query.make_date_filter(start_date, end_date, date_field = field)
 
-    date_filter = query.make_date_filter(start_date, end_date, date_field = field)
+def get_date_term_frequency(es_query, corpus, field, start_date_str, end_date_str=None, size=DEFAULT_SIZE, include_query_in_result=False, totals=None):
+    date_filter = make_date_bin_filter(field, start_date_str, end_date_str)
     es_query = query.add_filter(es_query, date_filter)
     query_text = query.get_query_text(es_query)
 
-    match_count, doc_count, token_count = get_term_frequency(es_query, corpus, size)
+    match_count, doc_count, token_count = get_term_frequency(es_query, corpus, size, totals)
 
     data = {
         'key': start_date_str,
@@ -38,9 +49,7 @@ def get_date_term_frequency(es_query, corpus, field, start_date_str, end_date_st
     return data
 
 def extract_data_for_term_frequency(corpus, es_query):
-    corpus_conf = CorpusConfiguration.objects.get(corpus__name=corpus)
-
-    all_fields = corpus_conf.fields.all()
+    all_fields = corpus_metadata(corpus).fields
     search_fields = query.get_search_fields(es_query)
     if search_fields:
         fields = list(filter(lambda field: field.name in search_fields, all_fields))
@@ -95,6 +104,81 @@ def get_match_count(es_client, es_query, corpus, size, fieldnames):
     match_count = n_matches + estimate_skipped
     return match_count
 
+def get_match_count_aggregated(es_client, es_query, corpus, fieldnames):
+    '''
+    Count the matches of the query with a single aggregation, instead of term vectors.
+
+    The count is exact and does not depend on the number of documents. This is only
+    possible for queries that consist of single terms; returns `None` if the query
+    contains phrases, wildcards or fuzzy search, or if the server does not support the
+    aggregation. In that case, use `get_match_count`.
+
+    If the script is rejected by a server, this is remembered, so later requests do
+    not try again.
+    '''
+    query_text = query.get_query_text(es_query)
+    if not query_text:
+        return None
+
+    server = server_for_corpus(corpus)
+    if server in _servers_without_term_stats:
+        return None
+
+    index = get_index(corpus)
+
+    term_queries = []
+    for field in fieldnames:
+        matcher = termvectors.get_query_matcher(query_text, index, field, es_client)
+        terms = matcher.exact_terms()
+        if terms is None:
+            return None
+        term_queries += [{'term': {field: term}} for term in terms]
+
+    if not term_queries:
+        return 0
+
+    count_query = {
+        'query': {
+            'bool': {
+                'filter': [es_query['query']],
+                'must': {
+                    'script_score': {
+                        'query': {'bool': {'should': term_queries}},
+                        'script': {'source': MATCH_COUNT_SCRIPT},
+                    }
+                }
+            }
+        },
+        'aggs': {
+            'match_count': {
+                'sum': {'script': {'source': '_score'}}
+            }
+        }
+    }
+
+    try:
+        results = es_client.search(index=index, size=0, **count_query)
+    except BadRequestError as e:
+        if _is_script_error(e):
+            _servers_without_term_stats.add(server)
+            logger.warning(
+                f'Server {server} does not support counting matches with an '
+                f'aggregation: {e}'
+            )
+        else:
+            logger.warning(f'Could not count matches with aggregation: {e}')
+        return None
+
+    return int(round(results['aggregations']['match_count']['value']))
+
+def _is_script_error(error: BadRequestError) -> bool:
+    '''Whether a request was rejected because of an error in a script'''
+    info = error.info.get('error', {}) if isinstance(error.info, dict) else {}
+    if not isinstance(info, dict):
+        return error.error == 'script_exception'
+    causes = [info] + info.get('root_cause', [])
+    return any(cause.get('type') == 'script_exception' for cause in causes)
+
 def count_matches_in_document(id, index, fieldnames, query_text, es_client):
     # get the term vectors for the hit
     result = es_client.termvectors(
@@ -130,37 +214,93 @@ def get_total_docs_and_tokens(es_client, query, corpus, token_count_aggregators)
     total_doc_count = total_hits(results)
 
     if token_count_aggregators:
-        token_count = int(sum(
-            results['aggregations'][counter]['value']
-            for counter in results['aggregations'] if counter.startswith('token_count')
-        ))
+        token_count = sum_token_counts(aggregation_results(results))
     else:
         token_count = None
 
     return total_doc_count, token_count
 
-def get_term_frequency(es_query, corpus, size):
+def sum_token_counts(aggregations):
+    return int(sum(
+        aggregations[counter]['value']
+        for counter in aggregations if counter.startswith('token_count')
+    ))
+
+def get_total_docs_and_tokens_by_bin(es_query, corpus, bin_filters):
+    '''
+    Get the total document count and (if available) token count for several bins in
+    a single search, using a `filters` aggregation.
+
+    Parameters:
+    - `es_query`: the query for the series. The search text will be removed.
+    - `corpus`: the name of the corpus
+    - `bin_filters`: a list of filters that select the documents in each bin
+
+    Returns a list with a `(total_doc_count, token_count)` tuple for each bin.
+    '''
+
+    _, token_count_aggregators = extract_data_for_term_frequency(corpus, es_query)
+
+    bins_aggregator = {
+        'filters': {
+            'filters': {str(i): bin_filter for i, bin_filter in enumerate(bin_filters)}
+        }
+    }
+    if token_count_aggregators:
+        bins_aggregator['aggs'] = token_count_aggregators
+
+    agg_query = query.remove_query(es_query) #remove search term filter
+    agg_query['aggs'] = {'bins': bins_aggregator}
+
+    results = search(
+        corpus = corpus,
+        query_model = agg_query,
+        size = 0, # don't include documents
+    )
+    buckets = aggregation_results(results)['bins']['buckets']
+
+    return [
+        (
+            buckets[str(i)]['doc_count'],
+            sum_token_counts(buckets[str(i)]) if token_count_aggregators else None,
+        )
+        for i in range(len(bin_filters))
+    ]
+
+def get_term_frequency(es_query, corpus, size, totals=None):
+    '''
+    Get the match count, total document count and token count for a query.
+
+    If `totals` is provided, it should be a `(total_doc_count, token_count)` tuple
+    (i.e. the output of `get_total_docs_and_tokens_by_bin`); in that case, only the
+    match count is computed.
+    '''
     client = elasticsearch(corpus)
 
     # field specifications (used for counting hits), and token count aggregators (for total word count)
     fieldnames, token_count_aggregators = extract_data_for_term_frequency(corpus, es_query)
 
     # count number of matches
-    match_count = get_match_count(client, deepcopy(es_query), corpus, size, fieldnames)
+    match_count = get_match_count_aggregated(client, es_query, corpus, fieldnames)
+    if match_count is None:
+        match_count = get_match_count(client, deepcopy(es_query), corpus, size, fieldnames)
 
     # get total document count and (if available) token count for bin
-    agg_query = query.remove_query(es_query) #remove search term filter
-    total_doc_count, token_count = get_total_docs_and_tokens(client, agg_query, corpus, token_count_aggregators)
+    if totals is not None:
+        total_doc_count, token_count = totals
+    else:
+        agg_query = query.remove_query(es_query) #remove search term filter
+        total_doc_count, token_count = get_total_docs_and_tokens(client, agg_query, corpus, token_count_aggregators)
 
     return match_count, total_doc_count, token_count
 
-def get_aggregate_term_frequency(es_query, corpus, field_name, field_value, size=DEFAULT_SIZE, include_query_in_result=False):
+def get_aggregate_term_frequency(es_query, corpus, field_name, field_value, size=DEFAULT_SIZE, include_query_in_result=False, totals=None):
     # filter for relevant value
     term_filter = query.make_term_filter(field_name, field_value)
     es_query = query.add_filter(es_query, term_filter)
     query_text = query.get_query_text(es_query)
 
-    match_count, doc_count, token_count = get_term_frequency(es_query, corpus, size)
+    match_count, doc_count, token_count = get_term_frequency(es_query, corpus, size, totals)
 
     result = {
         'key': field_value,
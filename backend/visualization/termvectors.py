@@ -1,11 +1,53 @@
-from es.client import elasticsearch
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from threading import Lock
+from django.conf import settings
+from es.client import elasticsearch, server_for_corpus
 import re
-from textdistance import damerau_levenshtein
 
 from visualization.simple_query_string import collect_terms
 
+DEFAULT_BATCH_SIZE = 100
+QUERY_MATCHER_CACHE_SIZE = 256
+
+def termvectors_batch_size(corpus_name):
+    '''
+    Number of documents per multi-termvectors request for the server of a corpus.
+    '''
+    server = server_for_corpus(corpus_name)
+    return settings.SERVERS[server].get('termvectors_batch_size', DEFAULT_BATCH_SIZE)
+
+def batched_termvectors(es_client, index, hit_chunks, fields, batch_size=DEFAULT_BATCH_SIZE, **kwargs):
+    '''
+    Iterates over the term vectors of search hits, using the multi-termvectors API.
+
+    Parameters:
+    - `es_client`: elasticsearch client
+    - `index`: the name of the index
+    - `hit_chunks`: an iterable of lists of hits, e.g. the output of `es.download.scroll_chunks`
+    - `fields`: the fields for which to fetch term vectors
+    - `batch_size`: the maximum number of documents per request
+    - kwargs: further arguments for the `mtermvectors()` method of the client, e.g.
+    `term_statistics`
+
+    Yields the result for each document, in the same format as the output of
+    the `termvectors()` method.
+    '''
+    for chunk in hit_chunks:
+        ids = [hit['_id'] for hit in chunk]
+        for start in range(0, len(ids), batch_size):
+            result = es_client.mtermvectors(
+                index=index,
+                ids=ids[start:start + batch_size],
+                fields=fields,
+                **kwargs
+            )
+            for doc in result['docs']:
+                if doc.get('found'):
+                    yield doc
+
 def get_terms(termvector_result, field):
-    termvectors = termvector_result['term_vectors']
+    termvectors = termvector_result.get('term_vectors', {})
     if field in termvectors:
         terms = termvectors[field]['terms']
         return terms
@@ -34,22 +76,198 @@ def list_tokens(term, details):
         for position in positions
     ]
 
+class QueryMatcher:
+    '''
+    Finds matches for an analysed query in lists of tokens.
+
+    The query is analysed once when the matcher is created, so the same matcher can be
+    used for any number of documents. Use `get_query_matcher` to get a (cached) matcher
+    for a query.
+
+    Each term in the analysed query is compiled into a `QueryTerm`. Matches are found by
+    checking each distinct term in the document against the first term of each component,
+    and then only checking the remaining terms of the component at those positions.
+    '''
+
+    def __init__(self, analyzed_query):
+        self.analyzed_query = analyzed_query
+        self.components = [
+            [compile_query_term(query_term) for query_term in component]
+            for component in analyzed_query
+        ]
+
+    def exact_terms(self):
+        '''
+        The terms in the query, if the query consists only of distinct single terms
+        without wildcards or fuzzy search. Returns `None` otherwise.
+        '''
+        if not all(len(component) == 1 for component in self.components):
+            return None
+        if not all(isinstance(component[0], ExactTerm) for component in self.components):
+            return None
+
+        terms = [component[0].query_term for component in self.components]
+        if len(set(terms)) < len(terms):
+            return None
+        return terms
+
+    def matches(self, tokens):
+        '''
+        Iterates over the matches in list of tokens (i.e. the output of `list_tokens`).
+
+        Each iteration is a tuple wit the start index (in tokens), stop index of the match, and term
+        '''
+        indices_by_term = defaultdict(list)
+        for i, token in enumerate(tokens):
+            indices_by_term[token['term']].append(i)
+
+        found = []
+        for component_index, component in enumerate(self.components):
+            first, rest = component[0], component[1:]
+            for term in first.matching_terms(indices_by_term):
+                for i in indices_by_term[term]:
+                    stop = i + len(component)
+                    if stop <= len(tokens) and all(
+                        query_term.matches(tokens[i + j]['term'])
+                        for j, query_term in enumerate(rest, start=1)
+                    ):
+                        found.append((i, component_index, stop))
+
+        for start, _, stop in sorted(found):
+            content = ' '.join([tokens[ind]['term'] for ind in range(start, stop)])
+            yield start, stop, content
+
+
+class QueryTerm(ABC):
+    '''
+    A term from an analysed query, which can be matched against terms in a document.
+    '''
+
+    @abstractmethod
+    def matches(self, term: str) -> bool:
+        pass
+
+    def matching_terms(self, terms):
+        '''
+        Filter an collection of (distinct) terms to those that match this query term.
+        '''
+        return [term for term in terms if self.matches(term)]
+
+
+class ExactTerm(QueryTerm):
+    def __init__(self, query_term: str):
+        self.query_term = query_term
+
+    def matches(self, term):
+        return term == self.query_term
+
+    def matching_terms(self, terms):
+        return [self.query_term] if self.query_term in terms else []
+
+
+class WildcardTerm(QueryTerm):
+    def __init__(self, query_term: str):
+        self.pattern = re.compile(query_term)
+
+    def matches(self, term):
+        return self.pattern.match(term) != None
+
+
+class FuzzyTerm(QueryTerm):
+    def __init__(self, query_term: str, max_distance: int):
+        self.query_term = query_term
+        self.max_distance = max_distance
+
+    def matches(self, term):
+        if abs(len(term) - len(self.query_term)) > self.max_distance:
+            return False
+        return within_distance(term, self.query_term, self.max_distance)
+
+
+def compile_query_term(query_term: str) -> QueryTerm:
+    '''
+    Parse a term from an analysed query (i.e. the output of `analyze_query_component`).
+
+    Query terms can include `.*` wildcards, or do fuzzy search with `~{edit-distance}` at the end.
+    '''
+
+    if '.*' in query_term:
+        return WildcardTerm(query_term)
+
+    fuzzy_match = re.search(r'(\S+)~(\d+)$', query_term)
+    if fuzzy_match:
+        return FuzzyTerm(fuzzy_match.group(1), int(fuzzy_match.group(2)))
+
+    return ExactTerm(query_term)
+
+
+def within_distance(a: str, b: str, max_distance: int) -> bool:
+    '''
+    Whether the damerau-levenshtein distance between two strings is at most `max_distance`.
+
+    Uses the same (restricted) distance as `textdistance.damerau_levenshtein`, but stops
+    as soon as the distance is known to exceed the maximum.
+    '''
+    previous_row = None
+    row = list(range(len(b) + 1))
+
+    for i in range(1, len(a) + 1):
+        two_back, previous_row = previous_row, row
+        row = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            row[j] = min(
+                previous_row[j] + 1,
+                row[j - 1] + 1,
+                previous_row[j - 1] + cost,
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], two_back[j - 2] + 1)
+        if min(row) > max_distance:
+            return False
+
+    return row[-1] <= max_distance
+
+
+_query_matcher_cache = OrderedDict()
+_query_matcher_cache_lock = Lock()
+
+def get_query_matcher(query_text, index, field, es_client = None) -> QueryMatcher:
+    '''
+    Get a `QueryMatcher` for a query on a field in an index.
+
+    Matchers are kept in a least-recently-used cache per process, keyed on the index,
+    field and query text, so the query is only analysed in Elasticsearch the first
+    time it is used.
+    '''
+    key = (index, field, query_text)
+
+    with _query_matcher_cache_lock:
+        if key in _query_matcher_cache:
+            _query_matcher_cache.move_to_end(key)
+            return _query_matcher_cache[key]
+
+    matcher = QueryMatcher(analyze_query(query_text, index, field, es_client))
+
+    with _query_matcher_cache_lock:
+        _query_matcher_cache[key] = matcher
+        while len(_query_matcher_cache) > QUERY_MATCHER_CACHE_SIZE:
+            _query_matcher_cache.popitem(last=False)
+
+    return matcher
+
+def clear_query_matcher_cache():
+    with _query_matcher_cache_lock:
+        _query_matcher_cache.clear()
+
 def token_matches(tokens, query_text, index, field, es_client = None):
     """
     Iterates over the matches in list of tokens (i.e. the output of `list_tokens`) for a query.
 
     Each iteration is a tuple wit the start index (in tokens), stop index of the match, and term
     """
-    analyzed_query = analyze_query(query_text, index, field, es_client)
-
-    for i in range(len(tokens)):
-        for component in analyzed_query:
-            if len(component) + i <= len(tokens):
-                if all(terms_match(tokens[i + j]['term'], component[j]) for j in range(len(component))):
-                    start = i
-                    stop = i + len(component)
-                    content = ' '.join([tokens[ind]['term'] for ind in range(start, stop)])
-                    yield start, stop, content
+    matcher = get_query_matcher(query_text, index, field, es_client)
+    return matcher.matches(tokens)
 
 
 def terms_match(term, query_term: str):
@@ -60,19 +278,7 @@ def terms_match(term, query_term: str):
     The edit distance is measured as damerau-levenshtein, since this is used by elasticsearch as well.
     """
 
-    # handle wildcard
-    if '.*' in query_term:
-        return re.match(query_term, term) != None
-
-    # handle fuzzy match
-    fuzzy_match = re.search(r'(\S+)~(\d+)$', query_term)
-    if fuzzy_match:
-        max_distance = int(fuzzy_match.group(2))
-        clean_query_term = fuzzy_match.group(1)
-        distance = damerau_levenshtein(term, clean_query_term)
-        return distance <= max_distance
-
-    return term == query_term
+    return compile_query_term(query_term).matches(term)
 
 def analyze_query(query_text, index, field, es_client = None):
     """
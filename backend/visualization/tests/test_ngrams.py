@@ -177,6 +177,27 @@ def test_absolute_bigrams(small_mock_corpus, index_small_mock_corpus, basic_quer
             else:
                 assert freq == 0
 
+def test_hits_without_source(small_mock_corpus, index_small_mock_corpus, basic_query, monkeypatch):
+    '''Only term vectors are needed, so hits should not include the source'''
+    hits = []
+
+    def recorded_scroll_chunks(*args, **kwargs):
+        chunks, total = ngram_scroll_chunks(*args, **kwargs)
+        def record(chunks):
+            for chunk in chunks:
+                hits.extend(chunk)
+                yield chunk
+        return record(chunks), total
+
+    ngram_scroll_chunks = ngram.scroll_chunks
+    monkeypatch.setattr(ngram, 'scroll_chunks', recorded_scroll_chunks)
+
+    frequent_query = query.set_query_text(basic_query, 'to')
+    get_binned_results(small_mock_corpus, frequent_query)
+
+    assert hits
+    assert all('_source' not in hit for hit in hits)
+
 def test_bigrams_with_quote(small_mock_corpus, index_small_mock_corpus, basic_query):
     cases = [
         {
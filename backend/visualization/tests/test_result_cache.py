@@ -0,0 +1,89 @@
+import pytest
+
+from visualization import result_cache, tasks
+from visualization.query import MATCH_ALL
+
+INDEX = 'test-small-mock-corpus-1'
+
+@pytest.fixture()
+def current_index(monkeypatch):
+    index = {'name': INDEX, 'requests': 0}
+    def mock_current_index(corpus_name):
+        index['requests'] += 1
+        return index['name']
+    monkeypatch.setattr(result_cache, 'current_index', mock_current_index)
+    return index
+
+def test_make_key(small_mock_corpus):
+    query = {'query': {'bool': {'must': {'match_all': {}}, 'filter': []}}}
+    reordered_query = {'query': {'bool': {'filter': [], 'must': {'match_all': {}}}}}
+
+    key = result_cache.make_key(small_mock_corpus, INDEX, query, field='content')
+    assert key == result_cache.make_key(small_mock_corpus, INDEX, reordered_query, field='content')
+    assert key != result_cache.make_key(small_mock_corpus, INDEX, query, field='title')
+    assert key != result_cache.make_key(
+        small_mock_corpus, 'test-small-mock-corpus-2', query, field='content'
+    )
+
+def test_term_frequency_bin_keys(current_index, small_mock_corpus):
+    request_json = {
+        'corpus_name': small_mock_corpus,
+        'es_query': MATCH_ALL,
+        'field_name': 'date',
+        'bins': [{'start_date': str(year), 'end_date': str(year)} for year in range(10)],
+    }
+    keys = result_cache.term_frequency_bin_keys(request_json, 'date_term_frequency')
+    assert len(set(keys)) == 10
+    # the index is only resolved once per request
+    assert current_index['requests'] == 1
+
+def test_cache_result(small_mock_corpus):
+    key = result_cache.make_key(small_mock_corpus, INDEX, MATCH_ALL, field='content')
+    assert result_cache.get_cached_result(key) is None
+
+    result_cache.cache_result(key, [{'key': 'test', 'doc_count': 1}])
+    assert result_cache.get_cached_result(key) == [{'key': 'test', 'doc_count': 1}]
+
+def test_get_cached_results(small_mock_corpus):
+    keys = [
+        result_cache.make_key(small_mock_corpus, INDEX, MATCH_ALL, bin=i)
+        for i in range(3)
+    ]
+    result_cache.cache_result(keys[0], 'a')
+    result_cache.cache_result(keys[1], 'b')
+    assert result_cache.get_cached_results(keys) is None
+
+    result_cache.cache_result(keys[2], 'c')
+    assert result_cache.get_cached_results(keys) == ['a', 'b', 'c']
+
+def test_no_cache(settings, small_mock_corpus):
+    settings.CACHES = {
+        key: value for key, value in settings.CACHES.items()
+        if key != result_cache.VISUALIZATION_CACHE
+    }
+    key = result_cache.make_key(small_mock_corpus, INDEX, MATCH_ALL, field='content')
+    assert key is None
+    result_cache.cache_result(key, 'test')
+    assert result_cache.get_cached_result(key) is None
+
+def test_cached_wordcloud_view(admin_client, current_index, small_mock_corpus, monkeypatch):
+    body = {
+        'corpus': small_mock_corpus,
+        'field': 'content',
+        'es_query': MATCH_ALL,
+        'size': 1000,
+    }
+    key = result_cache.wordcloud_key(body)
+    result_cache.cache_result(key, [{'key': 'cached', 'doc_count': 1}])
+
+    def fail(request_json):
+        raise Exception('should not compute the wordcloud')
+    monkeypatch.setattr(tasks, 'get_wordcloud_data', fail)
+
+    response = admin_client.post(
+        '/api/visualization/wordcloud',
+        body,
+        content_type='application/json'
+    )
+    assert response.status_code == 200
+    assert response.data == [{'key': 'cached', 'doc_count': 1}]
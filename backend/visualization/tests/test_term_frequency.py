@@ -1,4 +1,7 @@
 import pytest
+from unittest import mock
+from elasticsearch import BadRequestError
+
 from visualization import term_frequency
 
 def test_extract_data_for_term_frequency(small_mock_corpus):
@@ -57,6 +60,54 @@ def test_match_count(small_mock_corpus, es_client, index_small_mock_corpus, quer
     match_count = term_frequency.get_match_count(es_client, query, small_mock_corpus, 100, fieldnames)
     assert match_count == expected_count
 
+@pytest.mark.parametrize('query_text,expected_count', frequencies)
+def test_match_count_aggregated(small_mock_corpus, es_client, index_small_mock_corpus, query_text, expected_count):
+    """Test counting matches with an aggregation, for queries where this is supported"""
+
+    query = make_query(query_text=query_text)
+    fieldnames, aggregators = term_frequency.extract_data_for_term_frequency(small_mock_corpus, query)
+    match_count = term_frequency.get_match_count_aggregated(es_client, query, small_mock_corpus, fieldnames)
+
+    has_phrase_or_operator = any(char in query_text for char in '"*~')
+    if has_phrase_or_operator:
+        assert match_count == None
+    else:
+        assert match_count == expected_count
+
+class NoTermStatsClient:
+    '''Wraps a client to simulate a server that does not support _termStats'''
+
+    def __init__(self, client):
+        self.client = client
+        self.searches = 0
+
+    def search(self, **kwargs):
+        self.searches += 1
+        raise BadRequestError(
+            'search_phase_execution_exception', meta=mock.Mock(status=400),
+            body={'error': {
+                'type': 'search_phase_execution_exception',
+                'root_cause': [{'type': 'script_exception'}],
+            }},
+        )
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def test_match_count_aggregated_unsupported(small_mock_corpus, es_client, index_small_mock_corpus, monkeypatch):
+    monkeypatch.setattr(term_frequency, '_servers_without_term_stats', set())
+    client = NoTermStatsClient(es_client)
+    query = make_query(query_text='test')
+    fieldnames, _ = term_frequency.extract_data_for_term_frequency(small_mock_corpus, query)
+
+    for _ in range(3):
+        match_count = term_frequency.get_match_count_aggregated(client, query, small_mock_corpus, fieldnames)
+        assert match_count == None
+
+    # the unsupported script is only tried once
+    assert client.searches == 1
+
 def test_match_count_estimate(es_client_m_hits, es_client_k_hits, small_mock_corpus, basic_query):
     matches = term_frequency.get_match_count(es_client_m_hits, basic_query, small_mock_corpus, 1000, ['test'])
     # es_client_m_hits gives 5000 total hits and 10'000 terms for the 1000 document sample
@@ -149,6 +200,26 @@ def test_timeline_term_frequency(small_mock_corpus, index_small_mock_corpus):
         }
 
 
+def test_total_docs_and_tokens_by_bin(small_mock_corpus, index_small_mock_corpus):
+    query = make_query(query_text='of', search_in_fields=['content'])
+    bin_filters = [
+        term_frequency.make_date_bin_filter('date', '1800-01-01', '1850-01-01'),
+        term_frequency.query.make_term_filter('genre', 'Children'),
+        term_frequency.query.make_term_filter('genre', 'Romance'),
+    ]
+
+    totals = term_frequency.get_total_docs_and_tokens_by_bin(query, small_mock_corpus, bin_filters)
+    assert totals == [(2, 46), (1, 21), (1, 23)]
+
+    # results with precomputed totals should be the same
+    result = term_frequency.get_date_term_frequency(
+        query, small_mock_corpus, 'date', '1800-01-01', '1850-01-01', totals=totals[0]
+    )
+    assert result['total_doc_count'] == 2
+    assert result['token_count'] == 46
+    assert result['match_count'] == 3
+
+
 def make_query(query_text=None, search_in_fields=None):
     query = {
         "query": {
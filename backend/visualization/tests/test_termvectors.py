@@ -96,6 +96,29 @@ def test_query_analysis(es_client, small_mock_corpus, index_small_mock_corpus):
         assert sorted(analyzed) == sorted(case['analyzed'])
 
 
+def test_batched_termvectors(es_client, small_mock_corpus, index_small_mock_corpus):
+    corpus_conf = CorpusConfiguration.objects.get(corpus__name=small_mock_corpus)
+    es_index = corpus_conf.es_index
+
+    result = search.search(small_mock_corpus, {}, es_client, size=10)
+    hits = search.hits(result)
+    # split hits over multiple chunks, with a batch size smaller than a chunk
+    chunks = [hits[:3], hits[3:]]
+
+    results = list(termvectors.batched_termvectors(
+        es_client, es_index, chunks, fields=['title'], batch_size=2
+    ))
+
+    assert [result['_id'] for result in results] == [hit['_id'] for hit in hits]
+
+    for result in results:
+        single_result = es_client.termvectors(
+            index=es_index, id=result['_id'], fields=['title']
+        )
+        assert termvectors.get_terms(result, 'title') == \
+            termvectors.get_terms(single_result, 'title')
+
+
 @pytest.fixture
 def termvectors_result(es_client, small_mock_corpus, index_small_mock_corpus):
     corpus_conf = CorpusConfiguration.objects.get(corpus__name=small_mock_corpus)
@@ -121,3 +144,63 @@ def termvectors_result(es_client, small_mock_corpus, index_small_mock_corpus):
     )
 
     return termvectors_result
+
+
+class CountingIndices:
+    def __init__(self):
+        self.calls = 0
+
+    def analyze(self, index, text, field):
+        self.calls += 1
+        return {'tokens': [{'token': word.lower()} for word in text.split()]}
+
+class CountingClient:
+    def __init__(self):
+        self.indices = CountingIndices()
+
+def test_query_matcher_cache():
+    client = CountingClient()
+    tokens = [
+        {'position': i, 'term': word, 'ttf': 1}
+        for i, word in enumerate(TITLE_WORDS)
+    ]
+
+    for _ in range(5):
+        matches = list(termvectors.token_matches(tokens, 'modern prometheus', 'test-index', 'title', client))
+        assert len(matches) == 2
+
+    # one analysis request per query component
+    assert client.indices.calls == 2
+
+    termvectors.token_matches(tokens, 'modern prometheus', 'test-index', 'content', client)
+    assert client.indices.calls == 4
+
+
+TERMS_MATCH_CASES = [
+    ('prometheus', 'prometheus', True),
+    ('prometheus', 'prometh', False),
+    ('prometheus', 'prometh.*', True),
+    ('modern', 'prometh.*', False),
+    ('frankenstein', 'frankenstien~1', True),
+    ('frankenstein', 'fronkenstien~1', False),
+    ('frankenstein', 'fronkenstien~2', True),
+    ('frankenstein', 'frank~2', False),
+]
+
+@pytest.mark.parametrize('term,query_term,expected', TERMS_MATCH_CASES)
+def test_terms_match(term, query_term, expected):
+    assert termvectors.terms_match(term, query_term) == expected
+
+def test_query_matcher_phrases():
+    tokens = [
+        {'position': i, 'term': word, 'ttf': 1}
+        for i, word in enumerate(TITLE_WORDS + TITLE_WORDS)
+    ]
+    matcher = termvectors.QueryMatcher([['modern', 'prometheus'], ['frankenstein']])
+    matches = list(matcher.matches(tokens))
+    assert matches == [
+        (0, 1, 'frankenstein'),
+        (3, 5, 'modern prometheus'),
+        (5, 6, 'frankenstein'),
+        (8, 10, 'modern prometheus'),
+    ]
@@ -125,9 +125,88 @@ def test_wordcloud_counts(small_mock_corpus):
 
     assert counts['words'] == 5
 
+def test_wordcloud_counts_from_chunks(small_mock_corpus):
+    texts = [
+        'Some words',
+        'Even more!',
+        'Words, words, words...',
+        'More words! More!',
+        'That should be enough.',
+    ]
+    docs = [
+        {'_source': {'content': text}}
+        for text in texts
+    ]
+    chunks = [docs[:2], docs[2:]]
+
+    results = wordcloud.make_wordcloud_data_from_chunks(chunks, 'content', small_mock_corpus)
+    assert results == wordcloud.make_wordcloud_data(docs, 'content', small_mock_corpus)
+
+def test_word_counter_max_df():
+    counter = wordcloud.WordCounter(stopwords=['the'])
+    for text in ['the cat sat', 'the cat ran', 'the dog sat', 'the dog ate the cat']:
+        counter.add_text(text)
+
+    # 'cat' occurs in 3 of 4 texts, which exceeds max_df
+    assert counter.most_common() == [('ate', 1), ('dog', 2), ('ran', 1), ('sat', 2)]
+
+def test_word_counter_pruning():
+    counter = wordcloud.WordCounter(max_vocabulary_size=10)
+    counter.add_text(' '.join(['frequent'] * 5))
+    for i in range(20):
+        counter.add_text(f'rare{chr(97 + i)}')
+        assert len(counter.counts) <= 10
+
+    assert ('frequent', 5) in counter.most_common(max_df=1.0)
+
 def test_wordcloud_filters_stopwords(small_mock_corpus, small_mock_corpus_complete_wordcloud):
     stopwords = ['the', 'and', 'of']
     for stopword in stopwords:
         match = any(
             item['key'] == stopword for item in small_mock_corpus_complete_wordcloud)
         assert not match
+
+def test_use_termvectors(settings, small_mock_corpus):
+    assert not wordcloud.use_termvectors(small_mock_corpus, 'content')
+
+    settings.WORDCLOUD_ENGINES = {small_mock_corpus: 'termvectors'}
+    assert wordcloud.use_termvectors(small_mock_corpus, 'content')
+    assert wordcloud.termvectors_field(small_mock_corpus, 'content') == 'content.clean'
+    # title has no term vectors
+    assert not wordcloud.use_termvectors(small_mock_corpus, 'title')
+
+def test_wordcloud_from_termvectors(small_mock_corpus, index_small_mock_corpus, small_mock_corpus_complete_wordcloud):
+    result = search.search(
+        corpus=small_mock_corpus,
+        query_model=query.MATCH_ALL,
+        size=10
+    )
+    chunks = [search.hits(result)]
+
+    output = wordcloud.make_wordcloud_data_from_termvectors(chunks, 'content', small_mock_corpus)
+
+    assert output == small_mock_corpus_complete_wordcloud
+
+def test_wordcloud_task_termvectors_without_source(settings, monkeypatch, small_mock_corpus, index_small_mock_corpus, small_mock_corpus_complete_wordcloud):
+    from es import download
+    from visualization import tasks
+
+    settings.WORDCLOUD_ENGINES = {small_mock_corpus: 'termvectors'}
+    hits = []
+    original_scroll_chunks = download.scroll_chunks
+
+    def scroll_chunks(*args, **kwargs):
+        chunks, total = original_scroll_chunks(*args, **kwargs)
+        def recorded():
+            for chunk in chunks:
+                hits.extend(chunk)
+                yield chunk
+        return recorded(), total
+
+    monkeypatch.setattr(tasks.es_download, 'scroll_chunks', scroll_chunks)
+    request_json = {'corpus': small_mock_corpus, 'es_query': query.MATCH_ALL, 'field': 'content'}
+    output = tasks.get_wordcloud_data(request_json)
+
+    assert output == small_mock_corpus_complete_wordcloud
+    assert hits
+    assert not any('_source' in hit for hit in hits)
@@ -2,7 +2,7 @@ from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.exceptions import APIException, ParseError, ValidationError
-from visualization import tasks
+from visualization import tasks, result_cache
 import logging
 from django.conf import settings
 from rest_framework.permissions import IsAuthenticated
@@ -32,8 +32,12 @@ class WordcloudView(APIView):
                 detail=f'size exceeds {wordcloud_limit} documents')
 
         try:
-            # no need to run async: we will use the result directly
-            word_counts = tasks.get_wordcloud_data(request.data)
+            cache_key = result_cache.wordcloud_key(request.data)
+            word_counts = result_cache.get_cached_result(cache_key)
+            if word_counts is None:
+                # no need to run async: we will use the result directly
+                word_counts = tasks.get_wordcloud_data(request.data)
+                result_cache.cache_result(cache_key, word_counts)
             return Response(word_counts)
         except Exception as e:
             logger.error(e)
@@ -89,7 +93,12 @@ class NgramView(APIView):
         ])
 
         try:
-            chord = tasks.ngram_data_tasks(request.data)()
+            cache_key = result_cache.ngram_key(request.data)
+            cached = result_cache.get_cached_result(cache_key)
+            if cached is not None:
+                return Response({'task_ids': [result_cache.completed_task_id(cached)]})
+
+            chord = tasks.ngram_data_tasks(request.data, cache_key)()
             subtasks = [chord, *chord.parent.children]
             return Response({'task_ids': [task.id for task in subtasks]})
         except Exception as e:
@@ -120,8 +129,13 @@ class DateTermFrequencyView(APIView):
             raise ValidationError(detail='Maximum size exceeded')
 
         try:
+            cache_keys = result_cache.term_frequency_bin_keys(request.data, 'date_term_frequency')
+            cached = result_cache.get_cached_results(cache_keys)
+            if cached is not None:
+                return Response({'task_ids': [result_cache.completed_task_id(result) for result in cached]})
+
             group = tasks.timeline_term_frequency_tasks(
-                request.data).apply_async()
+                request.data, cache_keys=cache_keys).apply_async()
             subtasks = group.children
             return Response({'task_ids': [task.id for task in subtasks]})
         except Exception as e:
@@ -152,8 +166,13 @@ class AggregateTermFrequencyView(APIView):
             raise ValidationError(detail='Maximum size exceeded')
 
         try:
+            cache_keys = result_cache.term_frequency_bin_keys(request.data, 'aggregate_term_frequency')
+            cached = result_cache.get_cached_results(cache_keys)
+            if cached is not None:
+                return Response({'task_ids': [result_cache.completed_task_id(result) for result in cached]})
+
             group = tasks.histogram_term_frequency_tasks(
-                request.data).apply_async()
+                request.data, cache_keys=cache_keys).apply_async()
             subtasks = group.children
             return Response({'task_ids': [task.id for task in subtasks]})
         except Exception as e:
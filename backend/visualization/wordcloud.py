@@ -1,29 +1,44 @@
 from collections import Counter
+import heapq
+import re
+from django.conf import settings
 from sklearn.feature_extraction.text import CountVectorizer
 
-from addcorpus.models import Corpus
+from addcorpus.metadata import corpus_metadata
 from addcorpus.es_settings import get_nltk_stopwords
 from es import download as download
+from es.client import elasticsearch
+from es.search import get_index
+from visualization import termvectors
+
+TOKEN_PATTERN = r'(?u)\b[^0-9\s]{3,30}\b'
+MAX_FEATURES = 100
+MAX_DF = 0.7
+MAX_VOCABULARY_SIZE = 100000
 
 def field_stopwords(corpus_name, field_name):
-    corpus = Corpus.objects.get(name=corpus_name)
-    field = corpus.configuration.fields.get(name=field_name)
+    field = corpus_metadata(corpus_name).get_field(field_name)
     if field.language and field.language != 'dynamic':
         return get_nltk_stopwords(field.language)
     else:
         return []
 
+def document_text(document, field):
+    content = document['_source'][field]
+    if isinstance(content, str) and len(content):
+        return content
+    if isinstance(content, list) and len(content):
+        return '\n'.join(content)
+
 def make_wordcloud_data(documents, field, corpus):
     texts = []
     for document in documents:
-        content = document['_source'][field]
-        if isinstance(content, str) and len(content):
-            texts.append(content)
-        if isinstance(content, list) and len(content):
-            texts.append('\n'.join(content))
+        text = document_text(document, field)
+        if text:
+            texts.append(text)
 
     stopwords = field_stopwords(corpus, field)
-    cv = CountVectorizer(max_features=100, max_df=0.7, token_pattern=r'(?u)\b[^0-9\s]{3,30}\b', stop_words=stopwords)
+    cv = CountVectorizer(max_features=MAX_FEATURES, max_df=MAX_DF, token_pattern=TOKEN_PATTERN, stop_words=stopwords)
     cvtexts = cv.fit_transform(texts)
     counts = cvtexts.sum(axis=0).A1
     words = list(cv.get_feature_names_out())
@@ -31,3 +46,150 @@ def make_wordcloud_data(documents, field, corpus):
     output = [{'key': word, 'doc_count': int(freq_distribution[word])} for word in words]
     return output
 
+
+class WordCounter:
+    '''
+    Counts words in a stream of texts, with the same tokenisation and filtering as
+    the CountVectorizer in `make_wordcloud_data`.
+
+    Only the total count and document frequency of each word are kept, so memory
+    does not depend on the number of texts. If the vocabulary grows beyond
+    `max_vocabulary_size`, the least frequent half of it is dropped; this only
+    affects words that are very unlikely to end up in the top results.
+    '''
+
+    def __init__(self, stopwords=[], max_vocabulary_size=MAX_VOCABULARY_SIZE):
+        self.pattern = re.compile(TOKEN_PATTERN)
+        self.stopwords = set(stopwords)
+        self.max_vocabulary_size = max_vocabulary_size
+        self.counts = Counter()
+        self.doc_counts = Counter()
+        self.n_docs = 0
+
+    def add_text(self, text):
+        self._add_counts(Counter(self.pattern.findall(text.lower())))
+
+    def add_term_frequencies(self, frequencies):
+        '''
+        Add a document based on the frequencies of its terms (e.g. from term vectors),
+        rather than its text.
+        '''
+        counts = Counter()
+        for term, frequency in frequencies.items():
+            for token in self.pattern.findall(term.lower()):
+                counts[token] += frequency
+        self._add_counts(counts)
+
+    def _add_counts(self, counts):
+        for stopword in self.stopwords.intersection(counts):
+            del counts[stopword]
+
+        self.n_docs += 1
+        self.counts.update(counts)
+        self.doc_counts.update(counts.keys())
+
+        if len(self.counts) > self.max_vocabulary_size:
+            self._prune()
+
+    def _prune(self):
+        keep = self.max_vocabulary_size // 2
+        for word, _ in self.counts.most_common()[keep:]:
+            del self.counts[word]
+            del self.doc_counts[word]
+
+    def most_common(self, n=MAX_FEATURES, max_df=MAX_DF):
+        '''
+        The `n` most frequent words, excluding words that occur in more than a
+        proportion of `max_df` of the texts. Returns a list of `(word, count)` tuples,
+        sorted alphabetically.
+        '''
+        max_doc_count = max_df * self.n_docs
+        words = (
+            word for word in self.counts
+            if self.doc_counts[word] <= max_doc_count
+        )
+        top_words = heapq.nlargest(n, words, key=self.counts.get)
+        return [(word, self.counts[word]) for word in sorted(top_words)]
+
+
+def make_wordcloud_data_from_chunks(chunks, field, corpus):
+    '''
+    Make wordcloud data from chunks of documents (e.g. the output of
+    `es.download.scroll_chunks`), counting words one chunk at a time.
+    '''
+    counter = WordCounter(field_stopwords(corpus, field))
+
+    for chunk in chunks:
+        for document in chunk:
+            text = document_text(document, field)
+            if text:
+                counter.add_text(text)
+
+    return [
+        {'key': word, 'doc_count': int(count)}
+        for word, count in counter.most_common()
+    ]
+
+
+def termvectors_field(corpus_name, field_name):
+    '''
+    The (sub)field that should be used to make wordcloud data from term vectors.
+
+    This is the `.clean` multifield (with stopword removal) if it is available;
+    otherwise, the field itself if it stores term vectors. Returns `None` if neither is
+    available.
+    '''
+    field = corpus_metadata(corpus_name).get_field(field_name)
+    mapping = field.es_mapping
+
+    if 'clean' in mapping.get('fields', {}):
+        return field_name + '.clean'
+    if mapping.get('term_vector'):
+        return field_name
+
+def use_termvectors(corpus_name, field_name):
+    '''
+    Whether the wordcloud for a field should be computed from term vectors.
+
+    This is enabled per corpus in the WORDCLOUD_ENGINES setting, and requires that
+    the field has term vectors (see `termvectors_field`).
+    '''
+    engines = getattr(settings, 'WORDCLOUD_ENGINES', {})
+    if engines.get(corpus_name) != 'termvectors':
+        return False
+    return termvectors_field(corpus_name, field_name) is not None
+
+def make_wordcloud_data_from_termvectors(chunks, field, corpus):
+    '''
+    Make wordcloud data from the term vectors of documents.
+
+    `chunks` are chunks of hits (e.g. the output of `es.download.scroll_chunks`). Only
+    the IDs of the hits are used, so the search does not need to include the source.
+    Term frequencies are fetched from Elasticsearch in batches, without positions or
+    offsets, which is far less data than the text of each document.
+    '''
+    client = elasticsearch(corpus)
+    index = get_index(corpus)
+    tv_field = termvectors_field(corpus, field)
+    counter = WordCounter(field_stopwords(corpus, field))
+
+    results = termvectors.batched_termvectors(
+        client, index, chunks,
+        fields=[tv_field],
+        batch_size=termvectors.termvectors_batch_size(corpus),
+        positions=False,
+        offsets=False,
+        payloads=False,
+        field_statistics=False,
+    )
+    for result in results:
+        terms = termvectors.get_terms(result, tv_field)
+        if terms:
+            counter.add_term_frequencies({
+                term: details['term_freq'] for term, details in terms.items()
+            })
+
+    return [
+        {'key': word, 'doc_count': int(count)}
+        for word, count in counter.most_common()
+    ]
@@ -0,0 +1,281 @@
+'''
+Approximate nearest neighbour (ANN) search for word models with a large vocabulary.
+
+`KeyedVectors.most_similar` compares the query to every vector in the model. An
+`IVFIndex` (inverted file index) clusters the normalised vectors with k-means; a query
+is only compared to the vectors in the clusters with the nearest centroids.
+
+Indices are optional. They are built with the `build_wordmodel_index` command and
+saved next to the model files; if a model has no index, or its index does not match
+the model, searches are exact. Use the `benchmark_wordmodel_index` command to compare
+the recall and speed of approximate and exact search.
+'''
+
+from glob import glob
+import hashlib
+import logging
+import os
+from time import perf_counter
+from typing import List, Optional, Tuple
+
+import numpy as np
+from gensim.models import KeyedVectors
+
+logger = logging.getLogger(__name__)
+
+ANN_INDEX_SUFFIX = '.ann.npz'
+
+DEFAULT_PROBES = 8
+'Default number of clusters that are searched for a query'
+
+KMEANS_ITERATIONS = 10
+
+BATCH_SIZE = 10000
+'Number of vectors that are assigned to clusters at once while building an index'
+
+
+class IVFIndex:
+    '''
+    Inverted file index over the vectors of a word model.
+
+    - `centroids`: normalised centroid of each cluster
+    - `list_offsets`: the vectors of cluster `i` are `list_ids[list_offsets[i]:list_offsets[i + 1]]`
+    - `list_ids`: indices of vectors in the model, ordered by cluster
+    - `probes`: number of clusters to search for a query
+    - `fingerprint`: fingerprint of the model the index was built for (see
+    `model_fingerprint`), if known
+    '''
+
+    def __init__(
+        self, centroids: np.ndarray, list_offsets: np.ndarray, list_ids: np.ndarray,
+        probes: int = DEFAULT_PROBES, fingerprint: Optional[str] = None,
+    ):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+        self.probes = probes
+        self.fingerprint = fingerprint
+
+    @property
+    def n_clusters(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def n_vectors(self) -> int:
+        return len(self.list_ids)
+
+    @classmethod
+    def build(
+        cls, vectors: np.ndarray, n_clusters: Optional[int] = None,
+        probes: int = DEFAULT_PROBES, iterations: int = KMEANS_ITERATIONS,
+        seed: int = 0,
+    ) -> 'IVFIndex':
+        '''
+        Build an index by clustering the vectors with spherical k-means. By default,
+        the number of clusters is the square root of the number of vectors.
+        '''
+        normalised = _normalise(vectors)
+        n_clusters = min(n_clusters or int(np.sqrt(len(vectors))) or 1, len(vectors))
+        rng = np.random.default_rng(seed)
+        centroids = normalised[rng.choice(len(vectors), n_clusters, replace=False)]
+
+        for _ in range(iterations):
+            assignments = _assign(normalised, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, normalised)
+            counts = np.bincount(assignments, minlength=n_clusters)
+            # re-initialise empty clusters with random vectors
+            empty = counts == 0
+            sums[empty] = normalised[rng.choice(len(vectors), empty.sum())]
+            centroids = _normalise(sums)
+
+        assignments = _assign(normalised, centroids)
+        list_ids = np.argsort(assignments, kind='stable').astype(np.int32)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return cls(centroids.astype(np.float32), list_offsets, list_ids, probes)
+
+    def search(
+        self, vectors: KeyedVectors, query: np.ndarray, n: int,
+        probes: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        Find (approximately) the `n` vectors with the highest cosine similarity to
+        the query vector.
+
+        Returns the indices of the vectors in the model and their similarities, in
+        descending order of similarity. May return fewer than `n` results if the
+        searched clusters contain fewer vectors.
+        '''
+        probes = min(probes or self.probes, self.n_clusters)
+        query = _normalise(query[np.newaxis, :])[0]
+
+        centroid_scores = self.centroids @ query
+        nearest = np.argpartition(-centroid_scores, probes - 1)[:probes]
+        candidates = np.concatenate([
+            self.list_ids[self.list_offsets[c]:self.list_offsets[c + 1]]
+            for c in nearest
+        ])
+
+        vectors.fill_norms()
+        norms = vectors.norms[candidates]
+        scores = (vectors.vectors[candidates] @ query) / np.where(norms == 0, 1, norms)
+        if len(candidates) > n:
+            top = np.argpartition(-scores, n - 1)[:n]
+        else:
+            top = np.arange(len(candidates))
+        order = top[np.argsort(-scores[top], kind='stable')]
+        return candidates[order], scores[order]
+
+    def save(self, path: str) -> None:
+        with open(path, 'wb') as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                list_offsets=self.list_offsets,
+                list_ids=self.list_ids,
+                probes=self.probes,
+                fingerprint=self.fingerprint or '',
+            )
+
+    @classmethod
+    def load(cls, path: str) -> 'IVFIndex':
+        with np.load(path) as data:
+            return cls(
+                data['centroids'],
+                data['list_offsets'],
+                data['list_ids'],
+                int(data['probes']),
+                str(data['fingerprint']) if 'fingerprint' in data else None,
+            )
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _assign(normalised: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    '''Index of the nearest centroid for each vector'''
+    return np.concatenate([
+        np.argmax(normalised[start:start + BATCH_SIZE] @ centroids.T, axis=1)
+        for start in range(0, len(normalised), BATCH_SIZE)
+    ])
+
+
+def index_path(wm_file: str) -> str:
+    return wm_file + ANN_INDEX_SUFFIX
+
+
+def model_fingerprint(vectors: KeyedVectors) -> str:
+    '''
+    Fingerprint of a word model, based on its vocabulary and the shape and type of its
+    vectors. Used to check that an index was built for the model.
+    '''
+    digest = hashlib.sha256()
+    digest.update(repr((vectors.vectors.shape, str(vectors.vectors.dtype))).encode())
+    for key in vectors.index_to_key:
+        digest.update(str(key).encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def load_ann_index(wm_file: str, vectors: KeyedVectors) -> Optional[IVFIndex]:
+    '''
+    Load the ANN index of a model file, if it exists. Returns `None` if the index was
+    not built for the vectors of the model, e.g. because the model was replaced
+    afterwards.
+    '''
+    path = index_path(wm_file)
+    if not os.path.exists(path):
+        return None
+    index = IVFIndex.load(path)
+    if index.fingerprint != model_fingerprint(vectors):
+        logger.warning(
+            f'ANN index {path} does not match the word model; rebuild it with the '
+            'build_wordmodel_index command'
+        )
+        return None
+    return index
+
+
+def build_ann_indices(word_model_path: str, **kwargs) -> List[str]:
+    '''
+    Build an ANN index for each model in a directory, and save it next to the model.
+    Keyword arguments are passed on to `IVFIndex.build`.
+
+    Returns the paths of the index files.
+    '''
+    paths = []
+    for wm_file in sorted(glob('{}/*.wv'.format(word_model_path))):
+        vectors = KeyedVectors.load(wm_file, mmap='r')
+        index = IVFIndex.build(vectors.vectors, **kwargs)
+        index.fingerprint = model_fingerprint(vectors)
+        path = index_path(wm_file)
+        index.save(path)
+        logger.info(
+            f'Saved index with {index.n_clusters} clusters for {wm_file} to {path}'
+        )
+        paths.append(path)
+    return paths
+
+
+def approximate_most_similar(
+    vectors: KeyedVectors, index: IVFIndex, term: str, n: int,
+    probes: Optional[int] = None,
+) -> Optional[List[Tuple[str, float]]]:
+    '''
+    Find the `n` terms that are most similar to a term with an ANN index. Like
+    `KeyedVectors.most_similar`, the term itself is not included in the results.
+
+    Returns `None` if the index cannot be used, i.e. if it was built for different
+    vectors, or if it does not find enough results. Callers should fall back to
+    exact search in that case.
+    '''
+    if index.n_vectors != len(vectors):
+        logger.warning('ANN index does not match the word model; using exact search')
+        return None
+
+    term_index = vectors.key_to_index[term]
+    ids, scores = index.search(vectors, vectors.vectors[term_index], n + 1, probes)
+    results = [
+        (vectors.index_to_key[i], float(score))
+        for i, score in zip(ids.tolist(), scores.tolist())
+        if i != term_index
+    ][:n]
+
+    if len(results) < min(n, len(vectors) - 1):
+        return None
+    return results
+
+
+def measure_recall(
+    vectors: KeyedVectors, index: IVFIndex, terms: List[str], n: int,
+    probes: Optional[int] = None,
+) -> Tuple[float, float, float]:
+    '''
+    Compare approximate search to exact search for a list of terms.
+
+    Returns the recall of approximate search (the average fraction of the exact `n`
+    nearest neighbours that it finds), and the total time of exact and approximate
+    search in seconds.
+    '''
+    exact_time = 0.0
+    approximate_time = 0.0
+    recalls = []
+
+    for term in terms:
+        start = perf_counter()
+        exact = vectors.most_similar(term, topn=n)
+        exact_time += perf_counter() - start
+
+        start = perf_counter()
+        approximate = approximate_most_similar(vectors, index, term, n, probes) or []
+        approximate_time += perf_counter() - start
+
+        exact_keys = set(key for key, _ in exact)
+        found = exact_keys.intersection(key for key, _ in approximate)
+        recalls.append(len(found) / len(exact_keys) if exact_keys else 1.0)
+
+    recall = sum(recalls) / len(recalls) if recalls else 1.0
+    return recall, exact_time, approximate_time
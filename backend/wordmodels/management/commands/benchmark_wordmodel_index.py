@@ -0,0 +1,57 @@
+import random
+from django.core.management.base import BaseCommand, CommandError
+
+from wordmodels.ann import measure_recall
+from wordmodels.utils import load_word_models, time_label
+
+
+class Command(BaseCommand):
+    help = '''
+    Compare approximate nearest neighbour search to exact search for the word models
+    of a corpus (see build_wordmodel_index).
+
+    For each model with an index, reports the recall of approximate search (the
+    fraction of the exact nearest neighbours that it finds) and the time of both
+    methods, for a random sample of terms.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'corpus',
+            help='name of the corpus',
+        )
+        parser.add_argument(
+            '--sample', '-s',
+            type=int,
+            default=100,
+            help='number of terms to search per model (default: 100)',
+        )
+        parser.add_argument(
+            '--neighbours', '-n',
+            type=int,
+            default=10,
+            help='number of nearest neighbours per term (default: 10)',
+        )
+        parser.add_argument(
+            '--probes', '-p',
+            type=int,
+            help='number of clusters to search (default: the setting of the index)',
+        )
+
+    def handle(self, corpus, sample=100, neighbours=10, probes=None, **options):
+        models = [wm for wm in load_word_models(corpus) if wm['ann_index']]
+        if not models:
+            raise CommandError(f'Corpus {corpus} has no word models with an index')
+
+        rng = random.Random(0)
+        for wm in models:
+            vectors = wm['vectors']
+            terms = rng.sample(vectors.index_to_key, min(sample, len(vectors)))
+            recall, exact_time, approximate_time = measure_recall(
+                vectors, wm['ann_index'], terms, neighbours, probes
+            )
+            self.stdout.write(
+                f'{time_label(wm)}: recall@{neighbours} {recall:.3f}; '
+                f'exact {exact_time:.3f}s, approximate {approximate_time:.3f}s '
+                f'for {len(terms)} terms'
+            )
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from addcorpus.python_corpora.load_corpus import load_corpus_definition
+from wordmodels.ann import DEFAULT_PROBES, KMEANS_ITERATIONS, build_ann_indices
+
+
+class Command(BaseCommand):
+    help = '''
+    Build approximate nearest neighbour (ANN) indices for the word models of a corpus.
+
+    The index of each model is saved next to the model file. When an index is
+    present, nearest neighbours in that model are found with approximate search. To
+    go back to exact search, remove the index files.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'corpus',
+            help='name of the corpus',
+        )
+        parser.add_argument(
+            '--clusters', '-c',
+            type=int,
+            help='number of clusters per model (default: square root of the vocabulary size)',
+        )
+        parser.add_argument(
+            '--probes', '-p',
+            type=int,
+            default=DEFAULT_PROBES,
+            help=f'number of clusters to search for a query (default: {DEFAULT_PROBES}); '
+                'more probes give better recall, but slower searches',
+        )
+        parser.add_argument(
+            '--iterations', '-i',
+            type=int,
+            default=KMEANS_ITERATIONS,
+            help=f'number of k-means iterations (default: {KMEANS_ITERATIONS})',
+        )
+
+    def handle(self, corpus, clusters=None, probes=DEFAULT_PROBES,
+               iterations=KMEANS_ITERATIONS, **options):
+        corpus_definition = load_corpus_definition(corpus)
+        if not corpus_definition.word_models_present:
+            raise CommandError(f'Corpus {corpus} has no word models')
+
+        paths = build_ann_indices(
+            corpus_definition.word_model_path,
+            n_clusters=clusters,
+            probes=probes,
+            iterations=iterations,
+        )
+        for path in paths:
+            self.stdout.write(f'Saved {path}')
@@ -1,8 +1,9 @@
 from itertools import chain, combinations
+import numpy as np
 
 from addcorpus.python_corpora.load_corpus import load_corpus_definition
 from wordmodels.utils import load_word_models, word_in_model, time_label, time_labels, transform_query
-from wordmodels.similarity import find_n_most_similar, term_similarity
+from wordmodels.similarity import find_n_most_similar, similarity_matrix
 
 def neighbor_network_data(corpus_name: str, query: str):
     term = transform_query(query)
@@ -67,19 +68,16 @@ def _graph_links(wm, nodes):
         node['similarity'] for node in nodes
     )
 
+    similarities = similarity_matrix(wm, [node['term'] for node in nodes])
     links = []
 
-    for n1, n2 in combinations(nodes, 2):
-        i1 = n1['index']
-        i2 = n2['index']
-        term1 = n1['term']
-        term2 = n2['term']
-        similarity = term_similarity(wm, term1, term2)
-        if similarity and similarity >= threshold:
+    for (p1, n1), (p2, n2) in combinations(enumerate(nodes), 2):
+        similarity = similarities[p1, p2]
+        if not np.isnan(similarity) and similarity >= threshold:
             links.append({
-                'source': i1,
-                'target': i2,
-                'value': similarity,
+                'source': n1['index'],
+                'target': n2['index'],
+                'value': float(similarity),
                 'timeframe': time_label(wm),
             })
 
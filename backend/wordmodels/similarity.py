@@ -1,12 +1,14 @@
+from typing import List, Optional
 import numpy as np
 
+from wordmodels.ann import IVFIndex, approximate_most_similar
 from wordmodels.utils import transform_query
 
 def term_similarity(wm, term1, term2):
     vectors = wm['vectors']
     transformed1 = transform_query(term1)
     transformed2 = transform_query(term2)
-    vocab = vectors.index_to_key
+    vocab = vectors.key_to_index
     if transformed1 in vocab and transformed2 in vocab:
         similarity = vectors.similarity(transformed1, transformed2)
         return float(similarity)
@@ -18,13 +20,13 @@ def find_n_most_similar(wm, query_term, n):
     """
     transformed_query = transform_query(query_term)
     vectors = wm['vectors']
-    results = most_similar_items(vectors, transformed_query, n)
+    results = most_similar_items(vectors, transformed_query, n, wm.get('ann_index'))
     return [{
         'key': result[0],
         'similarity': result[1]
     } for result in results]
 
-def most_similar_items(vectors, term, n):
+def most_similar_items(vectors, term, n, ann_index: Optional[IVFIndex] = None):
     '''
     Find the n most similar terms in a keyed vectors matrix, while filtering on the vocabulary.
 
@@ -32,9 +34,56 @@ def most_similar_items(vectors, term, n):
     - `vectors`: the KeyedVectors
     - `term`: the term for which to find the nearest neighbours, transformed with `transform_query`
     - `n`: number of neighbours to return
+    - `ann_index`: optional ANN index of the vectors. If given, neighbours are found with
+    approximate search, unless the index cannot be used.
     '''
-    vocab = vectors.index_to_key
-    if term in vocab:
+    if term in vectors.key_to_index:
+        if ann_index:
+            results = approximate_most_similar(vectors, ann_index, term, n)
+            if results is not None:
+                return results
         results = vectors.most_similar(term, topn=n)
         return results
     return []
+
+def similarity_matrix(wm, terms: List[str]) -> np.ndarray:
+    '''
+    Compute the similarity between each pair of terms in a model, with a single
+    product of the normalised vectors of the terms.
+
+    Terms are transformed with `transform_query`. Returns a square matrix in the order
+    of `terms`; rows and columns of terms that are not in the model are NaN.
+    '''
+    in_model, normalised = _normalised_vectors(wm, terms)
+    matrix = np.full((len(terms), len(terms)), np.nan)
+    if in_model.any():
+        matrix[np.ix_(in_model, in_model)] = normalised @ normalised.T
+    return matrix
+
+def term_similarities(wm, term: str, others: List[str]) -> np.ndarray:
+    '''
+    Compute the similarity between a term and each of a list of other terms in a
+    model, with a single product of normalised vectors.
+
+    Terms are transformed with `transform_query`. Returns an array in the order of
+    `others`, which is NaN for terms that are not in the model (or everywhere, if
+    `term` is not in the model).
+    '''
+    similarities = np.full(len(others), np.nan)
+    term_in_model, term_vector = _normalised_vectors(wm, [term])
+    in_model, normalised = _normalised_vectors(wm, others)
+    if term_in_model.all() and in_model.any():
+        similarities[in_model] = normalised @ term_vector[0]
+    return similarities
+
+def _normalised_vectors(wm, terms: List[str]):
+    '''
+    Returns a boolean array that indicates which terms are in the model, and a matrix
+    with the normalised vectors of those terms.
+    '''
+    vectors = wm['vectors']
+    indices = [vectors.key_to_index.get(transform_query(term)) for term in terms]
+    in_model = np.array([index is not None for index in indices], dtype=bool)
+    selected = vectors.vectors[[index for index in indices if index is not None]]
+    normalised = selected / np.linalg.norm(selected, axis=1, keepdims=True)
+    return in_model, normalised
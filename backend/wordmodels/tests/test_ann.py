@@ -0,0 +1,96 @@
+import os
+import shutil
+from types import SimpleNamespace
+
+import numpy as np
+from gensim.models import KeyedVectors
+
+from addcorpus.python_corpora.load_corpus import load_corpus_definition
+from wordmodels.ann import (
+    IVFIndex, approximate_most_similar, build_ann_indices, index_path,
+    load_ann_index, measure_recall, model_fingerprint,
+)
+from wordmodels.similarity import find_n_most_similar
+from wordmodels.utils import load_word_models
+
+
+def test_search_all_clusters(mock_corpus):
+    vectors = load_word_models(mock_corpus)[0]['vectors']
+    index = IVFIndex.build(vectors.vectors, n_clusters=4, probes=4)
+    assert index.n_vectors == len(vectors)
+    assert sorted(index.list_ids.tolist()) == list(range(len(vectors)))
+
+    # searching all clusters is exact
+    for term in ['elizabeth', 'she', 'darcy']:
+        exact = vectors.most_similar(term, topn=10)
+        approximate = approximate_most_similar(vectors, index, term, 10)
+        assert [key for key, _ in approximate] == [key for key, _ in exact]
+        assert np.allclose(
+            [score for _, score in approximate], [score for _, score in exact],
+            atol=1e-5,
+        )
+
+
+def test_recall(mock_corpus):
+    vectors = load_word_models(mock_corpus)[0]['vectors']
+    index = IVFIndex.build(vectors.vectors, n_clusters=8, probes=4)
+    terms = vectors.index_to_key[:50]
+
+    recall, _, _ = measure_recall(vectors, index, terms, 5)
+    assert 0.5 < recall <= 1
+    recall_all, _, _ = measure_recall(vectors, index, terms, 5, probes=8)
+    assert recall_all == 1
+
+
+def test_index_mismatch(mock_corpus):
+    vectors = load_word_models(mock_corpus)[0]['vectors']
+    index = IVFIndex.build(vectors.vectors[:100])
+    assert approximate_most_similar(vectors, index, 'elizabeth', 10) is None
+
+
+def test_zero_vectors(mock_corpus):
+    vectors = load_word_models(mock_corpus)[0]['vectors']
+    zeros = KeyedVectors(vectors.vector_size)
+    matrix = np.array(vectors.vectors)
+    matrix[:10] = 0
+    zeros.add_vectors(vectors.index_to_key, matrix)
+    index = IVFIndex.build(zeros.vectors, n_clusters=4, probes=4)
+
+    results = approximate_most_similar(zeros, index, 'elizabeth', len(zeros))
+    assert not any(np.isnan(score) for _, score in results)
+
+
+def test_fingerprint(mock_corpus, tmpdir):
+    models = load_word_models(mock_corpus)
+    wm_file = str(tmpdir.join('model.wv'))
+    models[0]['vectors'].save(wm_file)
+
+    index = IVFIndex.build(models[0]['vectors'].vectors, n_clusters=4)
+    index.fingerprint = model_fingerprint(models[0]['vectors'])
+    index.save(index_path(wm_file))
+
+    assert load_ann_index(wm_file, models[0]['vectors']).fingerprint == index.fingerprint
+    # an index for a model with the same size but different terms is not used
+    assert len(models[1]['vectors']) == len(models[0]['vectors'])
+    assert load_ann_index(wm_file, models[1]['vectors']) is None
+
+
+def test_build_and_load_indices(mock_corpus, tmpdir):
+    corpus = load_corpus_definition(mock_corpus)
+    path = str(tmpdir.join('models'))
+    shutil.copytree(corpus.word_model_path, path)
+    definition = SimpleNamespace(word_model_path=path)
+
+    assert all(wm['ann_index'] is None for wm in load_word_models(definition))
+
+    paths = build_ann_indices(path, n_clusters=4, probes=4)
+    assert len(paths) == 3
+    assert all(os.path.exists(p) for p in paths)
+
+    # models are reloaded with their index
+    models = load_word_models(definition)
+    assert all(isinstance(wm['ann_index'], IVFIndex) for wm in models)
+
+    exact = find_n_most_similar(load_word_models(mock_corpus)[0], 'elizabeth', 5)
+    approximate = find_n_most_similar(models[0], 'elizabeth', 5)
+    assert [item['key'] for item in approximate] == [item['key'] for item in exact]
@@ -1,7 +1,7 @@
 import pytest
 import numpy as np
 
-from wordmodels.visualisations import get_diachronic_contexts
+from wordmodels.visualisations import get_diachronic_contexts, top_n_keys
 from wordmodels.conftest import TEST_BINS
 
 def assert_similarity_format(item, must_specify_time=True):
@@ -83,3 +83,10 @@ def test_diachronic_context(mock_corpus):
 
         most_similar_interval = max(data, key = lambda point : point['similarity'])
         assert most_similar_interval['time'] == case['most_similar_interval']
+
+
+def test_top_n_keys():
+    values = {'a': 0.1, 'b': 0.5, 'c': 0.3, 'd': 0.5}
+    assert top_n_keys(values, 2) == ['b', 'd']
+    assert top_n_keys(values, 3) == ['b', 'd', 'c']
+    assert top_n_keys(values, 10) == ['b', 'd', 'c', 'a']
@@ -1,4 +1,5 @@
 from copy import deepcopy
+import numpy as np
 import pytest
 from gensim.models import KeyedVectors
 
@@ -77,3 +78,33 @@ def test_vocab_is_subset_of_model(model_with_term_removed):
     neighbours = similarity.find_n_most_similar(model, similar_term, 10)
     assert not any([neighbour['key'] == missing_term for neighbour in neighbours])
     assert len(neighbours) == 10
+
+def test_similarity_matrix(mock_corpus):
+    model = load_word_models(mock_corpus)[0]
+    terms = ['elizabeth', 'She', 'he', 'nonexistingword']
+
+    matrix = similarity.similarity_matrix(model, terms)
+    assert matrix.shape == (4, 4)
+
+    for i, term1 in enumerate(terms):
+        for j, term2 in enumerate(terms):
+            expected = similarity.term_similarity(model, term1, term2)
+            if expected is None:
+                assert np.isnan(matrix[i, j])
+            else:
+                assert matrix[i, j] == pytest.approx(expected, abs=1e-5)
+
+def test_term_similarities(mock_corpus):
+    model = load_word_models(mock_corpus)[0]
+    others = ['she', 'He', 'nonexistingword']
+
+    similarities = similarity.term_similarities(model, 'elizabeth', others)
+    assert similarities[0] == pytest.approx(
+        similarity.term_similarity(model, 'elizabeth', 'she'), abs=1e-5
+    )
+    assert similarities[1] == pytest.approx(
+        similarity.term_similarity(model, 'elizabeth', 'he'), abs=1e-5
+    )
+    assert np.isnan(similarities[2])
+
+    assert np.isnan(similarity.term_similarities(model, 'nonexistingword', others)).all()
@@ -0,0 +1,86 @@
+from threading import Event, Thread
+from types import SimpleNamespace
+
+import pytest
+from textdistance import damerau_levenshtein
+
+from wordmodels import utils
+from wordmodels.utils import load_vocabulary, load_word_models
+from wordmodels.vocabulary import VocabularyIndex, deletions
+
+
+def test_deletions():
+    assert deletions('abc', 1) == {'abc', 'ab', 'ac', 'bc'}
+    assert deletions('abc', 2) == {'abc', 'ab', 'ac', 'bc', 'a', 'b', 'c'}
+
+
+def test_vocabulary(mock_corpus):
+    models = load_word_models(mock_corpus)
+    vocabulary = load_vocabulary(mock_corpus)
+
+    for model in models:
+        assert all(term in vocabulary for term in model['vectors'].index_to_key)
+    assert 'hwale' not in vocabulary
+    assert load_vocabulary(mock_corpus) is vocabulary
+
+
+def test_vocabulary_built_on_load(mock_corpus, monkeypatch):
+    utils.clear_word_models()
+    built = []
+    monkeypatch.setattr(
+        utils, 'VocabularyIndex', lambda terms: built.append(list(terms)) or set()
+    )
+
+    load_word_models(mock_corpus)
+    assert len(built) == 1
+
+    load_vocabulary(mock_corpus)
+    assert len(built) == 1
+    utils.clear_word_models()
+
+
+def test_loading_does_not_block_cached_models(mock_corpus, monkeypatch, tmpdir):
+    utils.clear_word_models()
+    load_word_models(mock_corpus)
+
+    started = Event()
+    release = Event()
+    read_word_models = utils._read_word_models
+
+    def slow_read(path):
+        started.set()
+        release.wait(10)
+        return read_word_models(path)
+
+    monkeypatch.setattr(utils, '_read_word_models', slow_read)
+    other = SimpleNamespace(word_model_path=str(tmpdir))
+    loading = Thread(target=load_word_models, args=(other,))
+    loading.start()
+    assert started.wait(10)
+
+    # cached models are served while another corpus is loading
+    cached = Thread(target=load_word_models, args=(mock_corpus,))
+    cached.start()
+    cached.join(5)
+    assert not cached.is_alive()
+
+    release.set()
+    loading.join()
+    utils.clear_word_models()
+
+
+@pytest.mark.parametrize('query', ['hwale', 'elizabth', 'Whale', 'sh', 'xyz'])
+@pytest.mark.parametrize('max_distance', [1, 2, 3])
+def test_similar_terms(mock_corpus, query, max_distance):
+    vocabulary = load_vocabulary(mock_corpus)
+    expected = sorted(
+        term for term in vocabulary.terms
+        if damerau_levenshtein(query, term) <= max_distance
+    )
+    assert vocabulary.similar_terms(query, max_distance) == expected
+
+
+def test_similar_terms_transposition():
+    vocabulary = VocabularyIndex(['abc', 'bac', 'cab', 'abcd'])
+    assert vocabulary.similar_terms('acb', 1) == ['abc', 'cab']
+    assert vocabulary.similar_terms('acb', 2) == ['abc', 'abcd', 'bac', 'cab']
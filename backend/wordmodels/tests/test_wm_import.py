@@ -1,10 +1,13 @@
 import numpy as np
+import os
+import shutil
+from types import SimpleNamespace
 
 import pytest
 
 from addcorpus.python_corpora.load_corpus import load_corpus_definition
 from addcorpus.models import CorpusDocumentationPage
-from wordmodels.utils import load_word_models, word_in_models, transform_query
+from wordmodels.utils import load_word_models, word_in_models, transform_query, clear_word_models
 from wordmodels.conftest import TEST_VOCAB_SIZE, TEST_DIMENSIONS, TEST_BINS
 
 def test_import(mock_corpus):
@@ -24,6 +27,33 @@ def test_import(mock_corpus):
         vocab = weights.index_to_key
         assert len(vocab) == TEST_VOCAB_SIZE
 
+def test_word_models_cache(mock_corpus, tmpdir, settings):
+    corpus = load_corpus_definition(mock_corpus)
+    path = str(tmpdir.join('models'))
+    shutil.copytree(corpus.word_model_path, path)
+    definition = SimpleNamespace(word_model_path=path)
+
+    clear_word_models()
+    models = load_word_models(definition)
+    assert load_word_models(definition)[0]['vectors'] is models[0]['vectors']
+
+    # modifying the result does not affect the cache
+    models[0]['start_year'] = 0
+    assert load_word_models(definition)[0]['start_year'] == 1810
+
+    # changed files are loaded again
+    model_file = os.path.join(path, 'model_1810_1839.wv')
+    stat = os.stat(model_file)
+    os.utime(model_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    reloaded = load_word_models(definition)
+    assert reloaded[0]['vectors'] is not models[0]['vectors']
+
+    # least recently used corpora are removed
+    settings.WORDMODELS_CACHE_SIZE = 1
+    load_word_models(corpus)
+    assert load_word_models(definition)[0]['vectors'] is not reloaded[0]['vectors']
+
+
 def test_word_in_models(mock_corpus):
     cases = [
         {
@@ -1,44 +1,164 @@
+from collections import OrderedDict
 import os
 from os.path import basename, exists, join, splitext
 import pickle
 from string import punctuation
-from textdistance import damerau_levenshtein
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
 from gensim.models import KeyedVectors
 
 from addcorpus.python_corpora.load_corpus import corpus_dir, load_corpus_definition
+from wordmodels.ann import load_ann_index
+from wordmodels.vocabulary import VocabularyIndex
 
 from glob import glob
 
+DEFAULT_WORD_MODELS_CACHE_SIZE = 4
+'Default number of corpora for which word models are kept in memory'
 
-def load_word_models(corpus):
+
+class CachedWordModels:
+    '''
+    Word models of a corpus that are kept in memory, with the signature of their
+    files (see `_word_model_files_signature`) and an index of the union of their
+    vocabularies. The index is built when the models are loaded.
+    '''
+
+    def __init__(self, signature: Tuple, models: List[Dict]):
+        self.signature = signature
+        self.models = models
+        self.vocabulary = VocabularyIndex(
+            term for model in models for term in model['vectors'].index_to_key
+        )
+
+
+_word_models: 'OrderedDict[str, CachedWordModels]' = OrderedDict()
+_word_models_lock = Lock()
+
+# locks for loading the models of each path, so concurrent requests do not load the
+# same models twice, while other corpora can still be served
+_loading_locks: Dict[str, Lock] = {}
+
+
+def load_word_models(corpus) -> List[Dict]:
+    '''
+    Load the word models of a corpus: a list with a model for each time bin.
+
+    Models are kept in memory (per process), so they are only read from disk when they
+    are first requested, or when the files have changed. Vectors that are stored in
+    separate files are memory-mapped, so the operating system can share them between
+    worker processes. Models are kept for at most `WORDMODELS_CACHE_SIZE` corpora; the
+    least recently used corpus is removed first.
+
+    If a model has an ANN index (see `wordmodels.ann`), it is included as `ann_index`.
+
+    Returns copies of the cached dictionaries, so callers can modify them without
+    affecting the cache. The vectors themselves are shared and should not be modified.
+    '''
+    return [dict(wm) for wm in _cached_word_models(corpus).models]
+
+
+def load_vocabulary(corpus) -> VocabularyIndex:
+    '''
+    Load the vocabulary index of the word models of a corpus. Like the models, the
+    index is kept in memory.
+    '''
+    return _cached_word_models(corpus).vocabulary
+
+
+def _cached_word_models(corpus) -> CachedWordModels:
     if type(corpus)==str:
         corpus = load_corpus_definition(corpus)
-    wv_list = glob('{}/*.wv'.format(corpus.word_model_path))
+    path = corpus.word_model_path
+    signature = _word_model_files_signature(path)
+
+    with _word_models_lock:
+        cached = _get_cached(path, signature)
+        if cached:
+            return cached
+        loading_lock = _loading_locks.setdefault(path, Lock())
+
+    with loading_lock:
+        with _word_models_lock:
+            # the models may have been loaded while waiting for the lock
+            cached = _get_cached(path, signature)
+            if cached:
+                return cached
+
+        # loading the models and building their vocabulary index can take a while,
+        # so this is done without holding the global lock
+        cached = CachedWordModels(signature, _read_word_models(path))
+        _store_cached(path, cached)
+
+    return cached
+
+
+def _get_cached(path: str, signature: Tuple) -> Optional[CachedWordModels]:
+    '''
+    Get models from the cache if their signature matches. Call this while holding
+    `_word_models_lock`.
+    '''
+    cached = _word_models.get(path)
+    if cached and cached.signature == signature:
+        _word_models.move_to_end(path)
+        return cached
+
+
+def _store_cached(path: str, cached: CachedWordModels) -> None:
+    with _word_models_lock:
+        _word_models[path] = cached
+        _word_models.move_to_end(path)
+        cache_size = getattr(
+            settings, 'WORDMODELS_CACHE_SIZE', DEFAULT_WORD_MODELS_CACHE_SIZE
+        )
+        while len(_word_models) > cache_size:
+            _word_models.popitem(last=False)
+
+
+def _read_word_models(path: str) -> List[Dict]:
+    wv_list = glob('{}/*.wv'.format(path))
     wv_list.sort()
-    wm = [
-            {
-                "start_year": get_year(wm_file, 1),
-                "end_year": get_year(wm_file, 2),
-                "vectors": KeyedVectors.load(wm_file),
-            }
-        for wm_file in wv_list
-    ]
-    return wm
+    models = []
+    for wm_file in wv_list:
+        vectors = KeyedVectors.load(wm_file, mmap='r')
+        models.append({
+            "start_year": get_year(wm_file, 1),
+            "end_year": get_year(wm_file, 2),
+            "vectors": vectors,
+            "ann_index": load_ann_index(wm_file, vectors),
+        })
+    return models
+
+
+def _word_model_files_signature(path: str) -> Tuple:
+    '''
+    Name, modification time and size of the model files in a directory (including
+    vectors saved in separate files), to detect changes.
+    '''
+    files = sorted(glob('{}/*.wv*'.format(path)))
+    stats = ((f, os.stat(f)) for f in files)
+    return tuple((f, stat.st_mtime_ns, stat.st_size) for f, stat in stats)
+
+
+def clear_word_models():
+    '''
+    Remove all word models from memory.
+    '''
+    with _word_models_lock:
+        _word_models.clear()
+
 
 def get_year(kv_filename, position):
     return int(splitext(basename(kv_filename))[0].split('_')[position])
 
 def word_in_models(query_term, corpus, max_distance=2):
-    models = load_word_models(corpus)
+    vocabulary = load_vocabulary(corpus)
     transformed_query = transform_query(query_term)
-    vocab = set()
-    for model in models:
-        vocab.update(model['vectors'].index_to_key)
-    if transformed_query in list(vocab):
+    if transformed_query in vocabulary:
         return { 'exists': True }
     # if word is not in vocab, search for close matches
-    is_similar = lambda term : damerau_levenshtein(query_term, term) <= max_distance
-    similar_keys = [term for term in list(vocab) if is_similar(term)]
+    similar_keys = vocabulary.similar_terms(query_term, max_distance)
     return {
         'exists': False,
         'similar_keys': similar_keys
@@ -1,9 +1,9 @@
-from functools import reduce
-from operator import concat
-import pandas as pd
+from itertools import chain
+from typing import Dict, List
+import numpy as np
 
 from addcorpus.python_corpora.load_corpus import load_corpus_definition
-from wordmodels.similarity import find_n_most_similar, term_similarity
+from wordmodels.similarity import find_n_most_similar, term_similarity, term_similarities
 from wordmodels.utils import load_word_models, time_labels
 
 
@@ -42,26 +42,47 @@ def get_diachronic_contexts(query_term, corpus_string, number_similar=NUMBER_SIM
         find_n_most_similar(time_bin, query_term, number_similar)
         for time_bin in wm_list
     ]
-    flattened_data = reduce(concat, data_per_timeframe)
-    all_words = list(set([item.get('key') for item in flattened_data]))
-    frequencies = {word: [] for word in all_words}
-    for item in flattened_data:
-        frequencies[item['key']].append(item['similarity'])
-    max_similarities = pd.DataFrame({'word': all_words, 'max': [max(f) for f in frequencies.values()]})
-    words = max_similarities.nlargest(number_similar, 'max')['word']
 
-    get_similarity = lambda word, time_bin: term_similarity(
-        time_bin,
-        query_term,
-        word
-    )
+    # select the words with the highest similarity in any time frame
+    max_similarities = {}
+    for item in chain(*data_per_timeframe):
+        word = item['key']
+        max_similarities[word] = max(
+            item['similarity'], max_similarities.get(word, item['similarity'])
+        )
+    words = top_n_keys(max_similarities, number_similar)
+
+    similarities_per_timeframe = [
+        term_similarities(time_bin, query_term, words)
+        for time_bin in wm_list
+    ]
 
     word_data = [
         {
             'key': word,
-            'similarity': get_similarity(word, time_bin),
+            'similarity': None if np.isnan(similarity) else float(similarity),
             'time': time_label
         }
-        for (time_label, time_bin) in zip(times, wm_list) for word in words]
+        for (time_label, similarities) in zip(times, similarities_per_timeframe)
+        for word, similarity in zip(words, similarities)
+    ]
 
     return word_data, times, data_per_timeframe
+
+
+def top_n_keys(values: Dict[str, float], n: int) -> List[str]:
+    '''
+    The keys with the `n` highest values, in descending order of value. Selected keys
+    with the same value are kept in insertion order.
+    '''
+    keys = list(values.keys())
+    if n <= 0:
+        return []
+    if n >= len(keys):
+        selected = np.arange(len(keys))
+    else:
+        scores = -np.array(list(values.values()))
+        selected = np.argpartition(scores, n - 1)[:n]
+        selected.sort()
+    scores = -np.array([values[keys[i]] for i in selected])
+    return [keys[selected[i]] for i in np.argsort(scores, kind='stable')]
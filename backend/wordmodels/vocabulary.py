@@ -0,0 +1,95 @@
+'''
+Index of the vocabulary of the word models of a corpus, used to check whether a term
+has a vector, and to suggest similar terms if it does not.
+'''
+
+from typing import Iterable, List, Set
+
+import numpy as np
+from textdistance import damerau_levenshtein
+
+MAX_INDEXED_DISTANCE = 2
+'Maximum edit distance for which similar terms are found with the index'
+
+
+def deletions(term: str, max_distance: int) -> Set[str]:
+    '''
+    All strings that can be made by deleting up to `max_distance` characters from a
+    term (including the term itself).
+    '''
+    results = {term}
+    current = {term}
+    for _ in range(max_distance):
+        current = {
+            variant[:i] + variant[i + 1:]
+            for variant in current
+            for i in range(len(variant))
+        }
+        results.update(current)
+    return results
+
+
+class VocabularyIndex:
+    '''
+    The union of the vocabularies of a list of word models, with a symmetric deletion
+    index to find terms within a small edit distance.
+
+    If two terms are within edit distance `k` of each other, deleting at most `k`
+    characters from each of them results in a common string. The index maps each
+    deletion of each term in the vocabulary to that term, so similar terms can be
+    found by looking up the deletions of the query, rather than comparing the query to
+    the full vocabulary. Deletions are stored as hashes in a sorted array, to keep
+    the index compact.
+    '''
+
+    def __init__(self, terms: Iterable[str], max_distance: int = MAX_INDEXED_DISTANCE):
+        self.terms = frozenset(terms)
+        self.max_distance = max_distance
+        self._term_list = sorted(self.terms)
+
+        hashes = []
+        term_ids = []
+        for i, term in enumerate(self._term_list):
+            for deletion in deletions(term, max_distance):
+                hashes.append(hash(deletion))
+                term_ids.append(i)
+
+        hashes = np.array(hashes, dtype=np.int64)
+        order = np.argsort(hashes, kind='stable')
+        self._hashes = hashes[order]
+        self._term_ids = np.array(term_ids, dtype=np.int32)[order]
+
+    def __contains__(self, term: str) -> bool:
+        return term in self.terms
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def similar_terms(self, query: str, max_distance: int) -> List[str]:
+        '''
+        Terms in the vocabulary with a Damerau-Levenshtein distance of at most
+        `max_distance` to the query, in alphabetical order.
+
+        If `max_distance` is larger than the distance of the index, this falls back
+        to comparing the query to every term.
+        '''
+        if max_distance > self.max_distance:
+            candidates = self._term_list
+        else:
+            keys = np.array(
+                [hash(deletion) for deletion in deletions(query, max_distance)],
+                dtype=np.int64,
+            )
+            starts = np.searchsorted(self._hashes, keys, side='left')
+            ends = np.searchsorted(self._hashes, keys, side='right')
+            ids = sorted(set(
+                term_id
+                for start, end in zip(starts, ends)
+                for term_id in self._term_ids[start:end].tolist()
+            ))
+            candidates = [self._term_list[i] for i in ids]
+
+        return [
+            term for term in candidates
+            if damerau_levenshtein(query, term) <= max_distance
+        ]